@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Backfill the product_tags table from the JSON Product.tags column.
+
+The API keeps product_tags in sync on every product write; run this once after
+upgrading an existing database, and after loading products with scripts that
+write Product.tags directly (e.g. populate_mock_data.py).
+
+Usage:
+    python backfill_product_tags.py
+"""
+import time
+from database import SessionLocal, init_db
+from services.product_tags import backfill_product_tags
+
+def main():
+    init_db()
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        written = backfill_product_tags(db)
+    finally:
+        db.close()
+    print(f"Wrote {written} product tags in {time.perf_counter() - started:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Benchmark read throughput under concurrent checkouts for each database profile.
+
+Each profile gets a fresh SQLite file seeded with products and customers.
+Reader threads run catalog listing queries (count + page, like GET /products)
+while writer threads place orders (order + items + stock update, like
+POST /orders). Reports reads/s, checkouts/s and read latency percentiles.
+
+Usage:
+    python benchmark_db_profiles.py
+    python benchmark_db_profiles.py --duration 20 --readers 8 --writers 2
+"""
+import argparse
+import contextlib
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, ENGINE_PROFILES, create_db_engine
+from models import Product, Order, OrderItem, User, OrderStatus, PaymentMethod
+
+CATEGORIES = ["electronics", "clothing", "books", "home_garden", "sports"]
+BRANDS = ["Apple", "Samsung", "Nike", "Sony", "Levi's", "Bose", "Dyson"]
+ADDRESS = {"street": "1 Main St", "city": "Austin", "state": "TX", "postal_code": "73301", "country": "US"}
+
+def seed(engine, product_count: int, user_count: int):
+    """Seed products and customers with bulk inserts"""
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [
+            {
+                "email": f"bench{i}@test.com",
+                "username": f"bench{i}",
+                "password_hash": "not-a-real-hash",
+                "first_name": "Bench",
+                "last_name": str(i),
+                "is_active": True,
+                "role": "customer",
+            }
+            for i in range(user_count)
+        ])
+        conn.execute(insert(Product.__table__), [
+            {
+                "name": f"Product {i}",
+                "description": f"Benchmark product number {i}",
+                "price": round(random.uniform(5, 2000), 2),
+                "sku": f"BENCH-{i:07d}",
+                "category": random.choice(CATEGORIES),
+                "brand": random.choice(BRANDS),
+                "stock_quantity": 1_000_000,
+                "reserved_quantity": 0,
+                "is_active": True,
+                "is_featured": i % 10 == 0,
+                "is_on_sale": i % 7 == 0,
+            }
+            for i in range(product_count)
+        ])
+
+def reader(Session, stop: threading.Event, latencies: list):
+    """Catalog browsing: filtered count + first page"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        db = Session()
+        try:
+            query = db.query(Product).filter(
+                Product.is_active == True,
+                Product.category == random.choice(CATEGORIES),
+                Product.price <= random.uniform(100, 2000),
+            )
+            query.count()
+            query.offset(random.randint(0, 100)).limit(20).all()
+        finally:
+            db.close()
+        latencies.append(time.perf_counter() - started)
+
+def writer(Session, stop: threading.Event, product_count: int, user_count: int, counter: list, errors: list):
+    """Checkout: create order with items and decrement stock in one transaction"""
+    while not stop.is_set():
+        db = Session()
+        try:
+            order = Order(
+                user_id=random.randint(1, user_count),
+                payment_method=PaymentMethod.CREDIT_CARD,
+                shipping_address=ADDRESS,
+                billing_address=ADDRESS,
+            )
+            order.status = OrderStatus.PENDING
+            order.subtotal = 0
+            order.total_amount = 0
+            db.add(order)
+            db.flush()
+
+            for product_id in random.sample(range(1, product_count + 1), 3):
+                product = db.query(Product).filter(Product.id == product_id).first()
+                db.add(OrderItem(order_id=order.id, product_id=product_id, quantity=1, unit_price=product.price))
+                product.stock_quantity -= 1
+                product.reserved_quantity += 1
+                order.subtotal += product.price
+            order.total_amount = order.subtotal
+
+            db.commit()
+            counter.append(1)
+        except Exception as e:
+            db.rollback()
+            errors.append(str(e))
+        finally:
+            db.close()
+
+def run_profile(profile: str, args) -> dict:
+    """Run the mixed workload against a fresh database for one profile"""
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        engine = create_db_engine(url, profile=profile)
+        seed(engine, args.products, args.users)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        stop = threading.Event()
+        latencies, checkouts, errors = [], [], []
+        threads = [
+            threading.Thread(target=reader, args=(Session, stop, latencies))
+            for _ in range(args.readers)
+        ] + [
+            threading.Thread(target=writer, args=(Session, stop, args.products, args.users, checkouts, errors))
+            for _ in range(args.writers)
+        ]
+
+        for thread in threads:
+            thread.start()
+        time.sleep(args.duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+
+    latencies.sort()
+    return {
+        "profile": profile,
+        "reads_per_sec": len(latencies) / args.duration,
+        "checkouts_per_sec": len(checkouts) / args.duration,
+        "read_p50_ms": statistics.median(latencies) * 1000 if latencies else 0,
+        "read_p95_ms": latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0,
+        "write_errors": len(errors),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", default=list(ENGINE_PROFILES), choices=list(ENGINE_PROFILES))
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per profile")
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=100)
+    args = parser.parse_args()
+
+    results = []
+    # The debug profile echoes SQL to stdout; keep the formatting cost but not the terminal noise
+    with open(os.devnull, "w") as devnull:
+        for profile in args.profiles:
+            print(f"Running '{profile}' profile for {args.duration:.0f}s "
+                  f"({args.readers} readers, {args.writers} checkout writers)...", file=sys.stderr)
+            with contextlib.redirect_stdout(devnull):
+                for handler in logging.getLogger("sqlalchemy.engine.Engine").handlers:
+                    handler.setStream(devnull)
+                results.append(run_profile(profile, args))
+
+    print("=" * 78)
+    print(f"{'profile':<12}{'reads/s':>12}{'checkouts/s':>14}{'read p50 ms':>14}{'read p95 ms':>14}{'errors':>10}")
+    print("-" * 78)
+    for r in results:
+        print(f"{r['profile']:<12}{r['reads_per_sec']:>12.1f}{r['checkouts_per_sec']:>14.1f}"
+              f"{r['read_p50_ms']:>14.2f}{r['read_p95_ms']:>14.2f}{r['write_errors']:>10}")
+    print("=" * 78)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Benchmark JSON response encoding for the largest API responses.
+
+Seeds a throwaway SQLite database, builds each payload the way its endpoint
+does, and times the encoding step only (no database or HTTP):
+
+  before  FastAPI's default path: response_model validation + serialization
+          (or jsonable_encoder without a response_model) and JSONResponse
+  after   the current path: ORJSONResponse as the app default, and
+          endpoints that already build dicts returning ORJSONResponse directly
+
+Usage:
+    python benchmark_serialization.py
+    python benchmark_serialization.py --users 1000 --reviews 200 --repeat 50
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, create_db_engine
+from models import Product, Review, User
+from schemas import ProductList, ReviewResponse, UserResponse
+
+CATEGORIES = ["electronics", "clothing", "books", "home_garden", "sports"]
+BRANDS = ["Apple", "Samsung", "Nike", "Sony", "Levi's", "Bose", "Dyson"]
+
+def seed(engine, user_count: int, product_count: int, review_count: int):
+    """Seed users, products and reviews with bulk inserts"""
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [
+            {
+                "email": f"bench{i}@test.com",
+                "username": f"bench{i}",
+                "password_hash": "not-a-real-hash",
+                "first_name": "Bench",
+                "last_name": str(i),
+                "phone": f"+1555{i:07d}",
+                "is_active": True,
+                "role": "customer",
+            }
+            for i in range(user_count)
+        ])
+        conn.execute(insert(Product.__table__), [
+            {
+                "name": f"Product {i}",
+                "description": f"Benchmark product number {i} " * 5,
+                "price": round(random.uniform(5, 2000), 2),
+                "sku": f"BENCH-{i:07d}",
+                "category": random.choice(CATEGORIES),
+                "brand": random.choice(BRANDS),
+                "stock_quantity": random.randint(0, 500),
+                "reserved_quantity": 0,
+                "is_active": True,
+                "images": [f"https://cdn.example.com/p/{i}/{n}.jpg" for n in range(3)],
+                "tags": ["bench", random.choice(CATEGORIES)],
+                "dimensions": {"length": 10.0, "width": 5.0, "height": 2.0},
+            }
+            for i in range(product_count)
+        ])
+        conn.execute(insert(Review.__table__), [
+            {
+                "user_id": random.randint(1, user_count),
+                "product_id": random.randint(1, product_count),
+                "rating": random.randint(1, 5),
+                "title": f"Review {i}",
+                "comment": "Solid product, would buy again. " * 4,
+                "is_approved": True,
+            }
+            for i in range(review_count)
+        ])
+
+def build_payloads(db, args) -> list:
+    """(name, content, response model or None, dict-building endpoint?) per benchmarked response"""
+    # GET /users?limit=1000: rows mapped to dicts in the endpoint
+    users = [
+        {
+            "id": user.id, "email": user.email, "username": user.username,
+            "first_name": user.first_name, "last_name": user.last_name, "phone": user.phone,
+            "is_active": user.is_active, "is_verified": user.is_verified, "is_email_verified": False,
+            "role": "customer", "created_at": user.created_at, "updated_at": user.updated_at, "last_login": None,
+        }
+        for user in db.query(User).limit(args.users)
+    ]
+
+    # GET /admin/reviews?limit=200: review.to_dict() with the product embedded
+    reviews = []
+    for review in db.query(Review).limit(args.reviews):
+        review_dict = review.to_dict()
+        review_dict["user"] = None
+        review_dict["product"] = review.product.to_dict()
+        review_dict["product_name"] = review.product.name
+        reviews.append(review_dict)
+
+    # GET /products?limit=100: ORM objects validated against the response model
+    products = db.query(Product).limit(100).all()
+    product_list = {"products": products, "total": len(products), "page": 1, "per_page": 100, "total_pages": 1}
+
+    # GET /analytics/sales?group_by=day: one bucket per day
+    start = datetime(2022, 1, 1)
+    sales = {
+        "sales_data": {
+            (start + timedelta(days=day)).date().isoformat(): {
+                "revenue": round(random.uniform(100, 10000), 2), "orders": random.randint(1, 50), "items": random.randint(1, 200)
+            }
+            for day in range(args.days)
+        },
+        "summary": {"total_revenue": 0.0, "total_orders": 0, "total_items": 0, "period": "all to all", "group_by": "day"},
+    }
+
+    return [
+        (f"GET /users (limit={len(users)})", users, List[UserResponse], True),
+        (f"GET /admin/reviews (limit={len(reviews)})", reviews, List[ReviewResponse], True),
+        ("GET /products (limit=100)", product_list, ProductList, False),
+        (f"GET /analytics/sales ({args.days} days)", sales, None, True),
+    ]
+
+def encode_before(content, model) -> bytes:
+    """FastAPI default: validate + serialize (or jsonable_encoder), then stdlib json"""
+    if model is None:
+        return JSONResponse(jsonable_encoder(content)).body
+    adapter = TypeAdapter(model)
+    return JSONResponse(adapter.dump_python(adapter.validate_python(content, from_attributes=True), mode="json")).body
+
+def encode_after(content, model, builds_dicts: bool) -> bytes:
+    """Current app: dict-building endpoints return ORJSONResponse, the rest use it as default class"""
+    if builds_dicts:
+        return ORJSONResponse(content).body
+    adapter = TypeAdapter(model)
+    return ORJSONResponse(adapter.dump_python(adapter.validate_python(content, from_attributes=True), mode="json")).body
+
+def time_ms(fn, repeat: int) -> float:
+    fn()  # Warm up (schema build, lazy loads)
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--reviews", type=int, default=200)
+    parser.add_argument("--days", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", profile="production")
+        seed(engine, args.users, 500, args.reviews)
+        db = sessionmaker(bind=engine)()
+        try:
+            payloads = build_payloads(db, args)
+            results = []
+            for name, content, model, builds_dicts in payloads:
+                size = len(encode_after(content, model, builds_dicts))
+                before = time_ms(lambda: encode_before(content, model), args.repeat)
+                after = time_ms(lambda: encode_after(content, model, builds_dicts), args.repeat)
+                results.append((name, size, before, after))
+        finally:
+            db.close()
+            engine.dispose()
+
+    print("=" * 82)
+    print(f"{'response':<36}{'size KB':>10}{'before ms':>12}{'after ms':>12}{'speedup':>12}")
+    print("-" * 82)
+    for name, size, before, after in results:
+        print(f"{name:<36}{size / 1024:>10.1f}{before:>12.2f}{after:>12.2f}{before / after:>11.1f}x")
+    print("=" * 82)
+
+if __name__ == "__main__":
+    main()
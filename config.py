@@ -24,6 +24,14 @@ class Settings(BaseSettings):
     jwt_algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
     refresh_token_expire_days: int = 7
+    auth_stateless: bool = False  # Trust signed sub/role/ver claims instead of loading the user per request
+    token_version_refresh_seconds: int = 30  # Reload revoked token versions written by other workers
+    token_cache_size: int = 10000  # Decoded tokens kept to skip repeated signature checks
+    token_cache_ttl_seconds: int = 300  # Upper bound per entry, never beyond the token's exp (0 disables)
+    bcrypt_rounds: int = 12  # Work factor for new hashes; weaker hashes are upgraded on login
+    password_hash_profile: str = "secure"  # "secure" (bcrypt_rounds) or "fast" (insecure, tests/seeding only)
+    password_pool_workers: int = 4  # Threads for bcrypt hashing/verification
+    password_pool_max_queue: int = 32  # Waiting requests beyond the workers before answering 503
     
     # CORS settings
     cors_origins: List[str] = [
@@ -46,6 +54,47 @@ class Settings(BaseSettings):
     
     # Database settings
     database_url: str = "sqlite:///./ecommerce.db"
+    database_read_url: Optional[str] = None  # Read replica; defaults to a read-only SQLite connection
+    database_profile: str = "debug"  # "debug" (SQL echo, SQLite defaults) or "production"
+    sqlite_cache_size_kb: int = 65536  # Page cache per connection (production profile)
+    sqlite_mmap_size: int = 268435456  # 256 MB memory-mapped I/O (production profile)
+    sqlite_busy_timeout_ms: int = 5000  # Wait this long for a lock before SQLITE_BUSY
+    
+    # Connection pool settings (server databases such as PostgreSQL)
+    db_pool_size: int = 10  # Persistent connections per engine, per worker
+    db_max_overflow: int = 20  # Extra connections allowed under burst load
+    db_pool_timeout: int = 30  # Seconds to wait for a free connection
+    db_pool_recycle: int = 1800  # Seconds before a connection is replaced
+    
+    # Query monitoring
+    query_stats_enabled: bool = True  # X-DB-Queries / X-DB-Time headers per request
+    n_plus_one_threshold: int = 5  # Warn when one statement shape repeats more often in a request
+    slow_query_threshold_ms: float = 100.0  # Log statements slower than this with their plan (0 disables)
+    slow_query_log_size: int = 100  # Distinct slow statements kept for /admin/perf/slow-queries
+    
+    # Caching
+    product_cache_size: int = 5000  # Product detail responses kept in memory
+    product_cache_ttl_seconds: int = 300  # Backstop for product writes made outside the API (0 = until invalidated)
+    autocomplete_top_k: int = 20  # Completions cached per trie node (upper bound for suggestion limits)
+    autocomplete_rebuild_seconds: int = 300  # Full rebuild interval; writes are applied incrementally in between
+    facet_price_buckets: List[float] = [25, 50, 100, 250, 500, 1000]  # Upper bounds of the price facet ranges
+    facet_max_values: int = 50  # Most frequent brand/category values returned per facet
+    catalog_index_enabled: bool = True  # Serve product listings from the in-memory column store
+    catalog_index_rebuild_seconds: int = 300  # Full rebuild interval; writes are applied incrementally in between
+    catalog_export_batch_size: int = 1000  # Rows fetched and streamed per chunk by /products/export.ndjson
+    product_batch_chunk_size: int = 500  # Rows written per statement and commit by the /products/batch endpoints
+    
+    # HTTP caching (Cache-Control per route; responses also carry ETags for If-None-Match)
+    cache_control_product: str = "public, max-age=30"
+    cache_control_product_list: str = "public, max-age=10"
+    cache_control_reviews: str = "public, max-age=60"
+    cache_control_user_profile: str = "private, no-cache"
+    cache_control_wishlist: str = "private, no-cache"
+    response_cache_enabled: bool = True  # Cache public GET responses in process (see services/response_cache.py)
+    response_cache_size: int = 2000  # Responses kept, least recently used evicted first
+    response_cache_ttl_seconds: float = 30.0  # Fresh lifetime unless purged by a write
+    response_cache_stale_seconds: float = 60.0  # Then served stale while one background request refreshes it
+    response_cache_max_body_bytes: int = 1048576  # Larger responses are not cached
     
     # Business rules
     max_cart_items: int = 50
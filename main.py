@@ -5,9 +5,11 @@ Industry-best-practice internal testing product for comprehensive API testing
 from fastapi import FastAPI, Depends, HTTPException, status, Query, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, Response, StreamingResponse
 from fastapi.exceptions import RequestValidationError
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func, delete, type_coerce, tuple_, or_, String
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 from typing import List, Optional, Dict, Any
 from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
@@ -17,7 +19,7 @@ import secrets
 import traceback
 
 # Import database and models
-from database import get_db, init_db
+from database import get_db, get_async_db, get_read_db, get_async_read_db, init_db, engine, read_engine, async_engine, async_read_engine
 from models import *
 from config import settings
 
@@ -29,15 +31,38 @@ from models.order import PaymentMethod, PaymentStatus, ShippingMethod, OrderStat
 
 # Import services
 from services.auth_service import *
+from services.token_versions import token_versions
+from services.password_service import password_pool
+from services.product_cache import product_cache
+from services.pagination import encode_cursor, decode_cursor
+from services.product_search import product_search
+from services.autocomplete import autocomplete
+from services.facets import parse_facets, facet_counts_query, build_facets
+from services.catalog_index import catalog_index, SORT_KEYS as CATALOG_SORT_KEYS
+from services.product_tags import sync_product_tags, tag_filter
+from services.http_cache import INSTANCE_ID, make_etag, etag_matches, cache_headers, not_modified
+from services.response_cache import ResponseCacheMiddleware, response_cache
+from services.fieldsets import parse_fields, load_fields, dump_fields
+from services.catalog_export import export_products_ndjson
+from services.product_batch import bulk_create_products, bulk_update_products, bulk_delete_products
+from services.query_stats import install_query_stats, start_request_stats, finish_request_stats
+from services.slow_query_log import SlowQueryLog
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     init_db()
+    product_search.install(engine)
     await create_sample_data()
+    token_versions.start()
+    autocomplete.start()
+    catalog_index.start()
     yield
     # Shutdown
-    pass
+    token_versions.stop()
+    await async_engine.dispose()
+    if async_read_engine is not async_engine:
+        await async_read_engine.dispose()
 
 # Create FastAPI app
 app = FastAPI(
@@ -81,9 +106,16 @@ app = FastAPI(
     docs_url="/docs",
     redoc_url="/redoc",
     openapi_url="/openapi.json",
+    # orjson encodes datetimes, enums and UUIDs natively and is several times faster than json
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
+# Serve public catalog GETs from the response cache. Added before CORS so it sits
+# inside it: CORS headers are still computed per request for cached responses
+app.add_middleware(ResponseCacheMiddleware, cache=response_cache)
+catalog_index.add_listener(lambda: response_cache.purge("catalog"))
+
 # Add CORS middleware - must be before routes
 app.add_middleware(
     CORSMiddleware,
@@ -94,6 +126,35 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Count SQL statements and DB time per request on every engine
+if settings.query_stats_enabled:
+    install_query_stats(engine, read_engine, async_engine.sync_engine, async_read_engine.sync_engine)
+
+# Capture slow statements with their query plan, explained on the read engine
+slow_query_log = SlowQueryLog(settings.slow_query_threshold_ms, max_statements=settings.slow_query_log_size)
+if settings.slow_query_threshold_ms > 0:
+    slow_query_log.install(
+        engine, read_engine, async_engine.sync_engine, async_read_engine.sync_engine,
+        explain_engine=read_engine
+    )
+
+@app.middleware("http")
+async def query_stats_middleware(request: Request, call_next):
+    """Expose per-request SQL statement count and DB time, and warn about N+1 patterns"""
+    if not settings.query_stats_enabled:
+        return await call_next(request)
+
+    stats, token = start_request_stats(request.scope)
+    try:
+        response = await call_next(request)
+    finally:
+        finish_request_stats(token)
+
+    response.headers["X-DB-Queries"] = str(stats.query_count)
+    response.headers["X-DB-Time"] = f"{stats.total_time * 1000:.2f}"  # milliseconds
+    stats.warn_repeated_statements(settings.n_plus_one_threshold)
+    return response
+
 # Global exception handler to ensure CORS headers are always included
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -173,7 +234,7 @@ async def health_check():
         "status": "healthy",
         "service": "E-commerce Testing API",
         "version": "1.0.0",
-        "database": "SQLite",
+        "database": engine.dialect.name,
         "timestamp": datetime.utcnow().isoformat(),
         "uptime": "running"
     }
@@ -279,9 +340,6 @@ async def api_info():
 async def create_sample_data():
     """Create comprehensive sample data for testing"""
     from database import SessionLocal
-    from passlib.context import CryptContext
-    
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
     
     db = SessionLocal()
     try:
@@ -541,7 +599,11 @@ async def create_sample_data():
 async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     """Register a new user"""
     try:
-        db_user = register_user(db, user_data)
+        # Reject duplicates before spending a password worker on the hash
+        check_registration_available(db, user_data)
+        # Hash on the password worker pool instead of the event loop
+        password_hash = await get_password_hash_async(user_data.password)
+        db_user = register_user(db, user_data, password_hash=password_hash, check_existing=False)
         # Convert User model to UserResponse
         return UserResponse(
             id=db_user.id,
@@ -565,10 +627,14 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Registration failed: {str(e)}")
 
 @app.post("/auth/login", response_model=TokenResponse)
-async def login(user_data: UserLogin, db: Session = Depends(get_db)):
+async def login(
+    user_data: UserLogin,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db)
+):
     """Login user and return JWT tokens"""
     try:
-        return login_user(db, user_data)
+        return await login_user_async(db, user_data, background_tasks)
     except HTTPException:
         # Re-raise HTTP exceptions (401, etc.)
         raise
@@ -598,6 +664,7 @@ async def refresh_token(
         user_id = payload.get("sub")
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid refresh token")
+        check_token_version(payload, user_id)
         
         user = db.query(User).filter(User.id == user_id).first()
         if user is None:
@@ -606,7 +673,8 @@ async def refresh_token(
         # Create new access token
         access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
         access_token = create_access_token(
-            data={"sub": str(user.id), "email": user.email, "role": user.role.value},
+            data={"sub": str(user.id), "email": user.email, "role": user.role.value,
+                  "ver": token_versions.get(user.id)},
             expires_delta=access_token_expires
         )
         
@@ -625,8 +693,16 @@ async def refresh_token(
 # ============================================================================
 
 @app.get("/users/me", response_model=UserProfile)
-async def get_current_user_profile(current_user: User = Depends(get_current_active_user)):
+async def get_current_user_profile(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_active_user)
+):
     """Get current user profile"""
+    etag = make_etag("user", current_user.id, current_user.updated_at)
+    if etag_matches(request, etag):
+        return not_modified(etag, settings.cache_control_user_profile)
+    response.headers.update(cache_headers(etag, settings.cache_control_user_profile))
     return current_user
 
 @app.put("/users/me", response_model=UserProfile)
@@ -651,15 +727,14 @@ async def list_users(
     db: Session = Depends(get_db)
 ):
     """List all users (admin only)"""
-    # Use raw SQL to avoid enum conversion issues
-    from sqlalchemy import text
-    query = text("""
-        SELECT id, email, username, first_name, last_name, phone, is_active, 
-               is_verified, role, created_at, updated_at
-        FROM users
-        LIMIT :limit OFFSET :skip
-    """)
-    result = db.execute(query, {"limit": limit, "skip": skip})
+    # Read role as plain text to avoid enum conversion issues with legacy
+    # upper-case values; works the same on SQLite and PostgreSQL
+    query = select(
+        User.id, User.email, User.username, User.first_name, User.last_name, User.phone,
+        User.is_active, User.is_verified, type_coerce(User.role, String).label("role"),
+        User.created_at, User.updated_at
+    ).order_by(User.id).offset(skip).limit(limit)
+    result = db.execute(query)
     users = []
     for row in result:
         role = row.role.lower() if row.role else 'customer'  # Convert to lowercase for API
@@ -678,7 +753,8 @@ async def list_users(
             'updated_at': row.updated_at,
             'last_login': None,  # Default value
         })
-    return users
+    # Rows already have the UserResponse shape; skip re-validation
+    return ORJSONResponse(users)
 
 @app.get("/users/{user_id}", response_model=UserResponse)
 async def get_user(
@@ -714,6 +790,10 @@ async def update_user(
                 value = value.upper()
             setattr(user, field, value)
     
+    # Role, status and email are token claims: revoke tokens issued before the change
+    if any(field in user_update for field in ('role', 'is_active', 'email')):
+        token_versions.bump(db, user.id)
+    
     user.updated_at = datetime.utcnow()
     db.commit()
     db.refresh(user)
@@ -733,6 +813,7 @@ async def delete_user(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
+    token_versions.bump(db, user.id)
     db.delete(user)
     db.commit()
     return {"message": "User deleted successfully"}
@@ -741,10 +822,59 @@ async def delete_user(
 # PRODUCT ENDPOINTS
 # ============================================================================
 
+# Sort options for product listings: column and whether it is descending.
+# Ties are broken by id in the same direction so every order is deterministic.
+PRODUCT_SORTS = {
+    "id": (Product.id, False),
+    "price": (Product.price, False),
+    "price_desc": (Product.price, True),
+    "rating": (Product.average_rating, True),
+    "newest": (Product.created_at, True),
+}
+
+def _apply_product_search(query, search_text: str, like_columns: list):
+    """
+    Filter a product query by free text through the FTS5 index, falling back
+    to LIKE on like_columns without one. FTS matches each query word as a word
+    prefix ("iph" finds "iPhone", "phone" doesn't); LIKE matches substrings.
+    Returns (query, BM25 rank column or None).
+    """
+    matches = product_search.match_subquery(search_text) if product_search.enabled else None
+    if matches is None:
+        return query.where(or_(*(column.contains(search_text) for column in like_columns))), None
+    return query.join(matches, matches.c.product_id == Product.id), matches.c.rank
+
+def _product_changed(*product_ids: int):
+    """Invalidate derived product data; call after committing product changes"""
+    product_cache.invalidate(*product_ids)
+    response_cache.purge("catalog", *(f"product:{product_id}" for product_id in product_ids))
+    autocomplete.refresh_products(*product_ids)
+    catalog_index.refresh_products(*product_ids)
+
+def _reviews_changed(product_id: int):
+    """Purge cached review listings of a product; call after committing review changes"""
+    response_cache.purge(f"reviews:{product_id}")
+
+async def _hydrate_products(db: AsyncSession, product_ids: List[int], *options) -> list:
+    """Load products by id with one query, as 1-tuples in the given order"""
+    if not product_ids:
+        return []
+    result = await db.execute(
+        select(Product).options(*options).where(Product.id.in_(product_ids), Product.is_active == True)
+    )
+    products = {product.id: product for product in result.scalars()}
+    # A product deleted or deactivated since the index was updated is skipped
+    return [(products[product_id],) for product_id in product_ids if product_id in products]
+
 @app.get("/products", response_model=ProductList)
 async def list_products(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page; replaces skip"),
+    sort: str = Query("id", regex="^(id|price|price_desc|rating|newest|relevance)$", description="relevance ranks search matches (BM25)"),
+    include_total: Optional[bool] = Query(None, description="Count all matches (default: true with skip, false with cursor)"),
     category: Optional[ProductCategory] = Query(None),
     brand: Optional[str] = Query(None),
     min_price: Optional[float] = Query(None, ge=0),
@@ -753,53 +883,293 @@ async def list_products(
     featured: Optional[bool] = Query(None),
     on_sale: Optional[bool] = Query(None),
     in_stock: Optional[bool] = Query(None),
-    db: Session = Depends(get_db)
+    tags: Optional[str] = Query(None, description="Comma-separated tags"),
+    tags_match: str = Query("all", regex="^(all|any)$", description="Require all tags or any of them"),
+    facets: Optional[str] = Query(None, description="Comma-separated facet counts to return: category,brand,price,rating,in_stock"),
+    fields: Optional[str] = Query(None, description="Comma-separated product fields to return, e.g. id,name,price,thumbnail"),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    """List products with filtering and pagination"""
-    query = db.query(Product).filter(Product.is_active == True)
+    """
+    List products with filtering and pagination.
+    Follow next_cursor for deep pagination: it seeks on the sort key instead of
+    skipping rows, so every page costs the same.
+    """
+    # Listings only change through product writes and catalog index updates
+    etag = make_etag(INSTANCE_ID, product_cache.generation, catalog_index.version, str(request.url.query))
+    if etag_matches(request, etag):
+        return not_modified(etag, settings.cache_control_product_list)
+    response.headers.update(cache_headers(etag, settings.cache_control_product_list))
+    facet_names = parse_facets(facets)
+    field_names = parse_fields(fields, ProductResponse)
+    query = select(Product).where(Product.is_active == True)
     
     if category:
-        query = query.filter(Product.category == category)
+        query = query.where(Product.category == category.value)
     if brand:
-        query = query.filter(Product.brand == brand)
+        query = query.where(Product.brand == brand)
     if min_price is not None:
-        query = query.filter(Product.price >= min_price)
+        query = query.where(Product.price >= min_price)
     if max_price is not None:
-        query = query.filter(Product.price <= max_price)
+        query = query.where(Product.price <= max_price)
+    search_rank = None
     if search:
-        query = query.filter(
-            Product.name.contains(search) | 
-            Product.description.contains(search) |
-            Product.brand.contains(search)
+        query, search_rank = _apply_product_search(
+            query, search, [Product.name, Product.description, Product.brand]
         )
     if featured is not None:
-        query = query.filter(Product.is_featured == featured)
+        query = query.where(Product.is_featured == featured)
     if on_sale is not None:
-        query = query.filter(Product.is_on_sale == on_sale)
+        query = query.where(Product.is_on_sale == on_sale)
     if in_stock is not None:
         if in_stock:
-            query = query.filter(Product.stock_quantity > 0)
+            query = query.where(Product.stock_quantity > 0)
         else:
-            query = query.filter(Product.stock_quantity == 0)
+            query = query.where(Product.stock_quantity == 0)
+    if tags:
+        query = query.where(tag_filter(tags.split(","), tags_match))
+    
+    if include_total is None:
+        include_total = cursor is None
+    facet_counts = None
+    if facet_names:
+        # Counts under the current filters, all facets in one statement
+        rows = (await db.execute(facet_counts_query(query, facet_names))).all()
+        facet_counts = build_facets(rows, facet_names)
+    
+    if sort == "relevance":
+        # Best BM25 match first (lower is better); plain id order without a ranked search
+        sort_column, descending = (search_rank, False) if search_rank is not None else (Product.id, False)
+    else:
+        sort_column, descending = PRODUCT_SORTS[sort]
+    # Only the requested columns (plus the sort key for the cursor) are loaded
+    load_options = [load_fields(Product, field_names, sort_column.key)] if field_names else []
+    
+    if not search and not tags and catalog_index.ready:
+        # Filter and order in the in-memory column store; only the page is read from the database
+        page_ids, total = catalog_index.search(
+            categories=[category.value] if category else None,
+            brands=[brand] if brand is not None else None,
+            min_price=min_price,
+            max_price=max_price,
+            featured=featured,
+            on_sale=on_sale,
+            in_stock=in_stock,
+            sort=sort_column.key,
+            descending=descending,
+            after=decode_cursor(cursor, sort) if cursor else None,
+            offset=0 if cursor else skip,
+            limit=limit + 1,
+            count_total=include_total
+        )
+        rows = await _hydrate_products(db, page_ids, *load_options)
+    else:
+        total = None
+        if include_total:
+            total = await db.scalar(select(func.count()).select_from(query.subquery()))
+        if sort_column is search_rank:
+            query = query.add_columns(search_rank)
+        if sort_column is Product.id:
+            order_by = [Product.id.desc() if descending else Product.id]
+        else:
+            order_by = [sort_column.desc(), Product.id.desc()] if descending else [sort_column, Product.id]
+        
+        if cursor:
+            sort_value, last_id = decode_cursor(cursor, sort)
+            if sort_column is Product.id:
+                position, after = Product.id, last_id
+            else:
+                position, after = tuple_(sort_column, Product.id), tuple_(sort_value, last_id)
+            query = query.where(position < after if descending else position > after)
+        else:
+            query = query.offset(skip)
+        
+        # One extra row tells whether another page exists
+        rows = (await db.execute(query.options(*load_options).order_by(*order_by).limit(limit + 1))).all()
     
-    total = query.count()
-    products = query.offset(skip).limit(limit).all()
+    products = [row[0] for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        sort_value = last[1] if sort_column is search_rank else getattr(last[0], sort_column.key)
+        next_cursor = encode_cursor(sort, sort_value, last[0].id)
     
-    return ProductList(
-        products=products,
+    page_info = dict(
         total=total,
-        page=skip // limit + 1,
+        page=None if cursor else skip // limit + 1,
         per_page=limit,
-        total_pages=(total + limit - 1) // limit
+        total_pages=(total + limit - 1) // limit if total is not None and not cursor else None,
+        next_cursor=next_cursor,
+        facets=facet_counts
     )
+    if field_names:
+        # Trimmed products no longer match ProductList; send the payload as built
+        content = ProductList(products=[], **page_info).model_dump(mode="json")
+        content["products"] = dump_fields(ProductResponse, field_names, products)
+        return ORJSONResponse(content, headers=dict(response.headers))
+    return ProductList(products=products, **page_info)
+
+def _product_etag(product: Product) -> str:
+    """ETag of a product detail response"""
+    return make_etag("product", product.id, product.updated_at)
+
+# The export and batch routes are declared before /products/{product_id}, which
+# would otherwise capture their paths (and fail to parse them as an id)
+@app.get("/products/export.ndjson")
+async def export_products(
+    updated_since: Optional[datetime] = Query(None, description="Only products updated at or after this time"),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Stream every active product as newline-delimited JSON (admin only).
+    Rows are read from a server-side cursor in batches, so memory stays flat
+    for any catalog size; use updated_since for incremental syncs.
+    """
+    return StreamingResponse(
+        export_products_ndjson(updated_since),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="products.ndjson"'}
+    )
+
+@app.post("/products/batch")
+async def batch_create_products(
+    products_data: List[dict],
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Batch create products (admin only).
+    SKUs are checked with one query and products inserted in chunks, one
+    statement and commit each; errors are reported per input index.
+    """
+    created_products, errors = bulk_create_products(db, products_data)
+    
+    _product_changed(*created_products)
+    return {
+        "created_count": len(created_products),
+        "error_count": len(errors),
+        "created_product_ids": created_products,
+        "errors": errors
+    }
+
+@app.put("/products/batch")
+async def batch_update_products(
+    updates_data: List[dict],
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Batch update products (admin only).
+    Rows are checked with one query and applied with one executemany UPDATE
+    per chunk of rows changing the same fields; errors are reported per input index.
+    """
+    updated_products, errors = bulk_update_products(db, updates_data)
+    
+    _product_changed(*updated_products)
+    return {
+        "updated_count": len(updated_products),
+        "error_count": len(errors),
+        "updated_product_ids": updated_products,
+        "errors": errors
+    }
+
+@app.delete("/products/batch")
+async def batch_delete_products(
+    product_ids: List[int],
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Batch delete products (admin only).
+    Missing products and those with active orders are found with one query
+    each; the rest are deleted in one transaction with their child rows.
+    """
+    deleted_ids, errors = bulk_delete_products(db, product_ids)
+    
+    _product_changed(*deleted_ids)
+    for product_id in deleted_ids:
+        _reviews_changed(product_id)  # Their reviews were deleted with them
+    return {
+        "deleted_count": len(deleted_ids),
+        "error_count": len(errors),
+        "errors": errors
+    }
 
 @app.get("/products/{product_id}", response_model=ProductResponse)
-async def get_product(product_id: int, db: Session = Depends(get_db)):
+async def get_product(
+    product_id: int,
+    request: Request,
+    fields: Optional[str] = Query(None, description="Comma-separated product fields to return"),
+    db: Session = Depends(get_read_db)
+):
     """Get product by ID"""
-    product = db.query(Product).filter(Product.id == product_id, Product.is_active == True).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-    return product
+    if field_names := parse_fields(fields, ProductResponse):
+        product = db.query(Product).options(load_fields(Product, field_names, "updated_at")).filter(
+            Product.id == product_id, Product.is_active == True
+        ).first()
+        if not product:
+            raise HTTPException(status_code=404, detail="Product not found")
+        etag = make_etag("product", product.id, product.updated_at, field_names)
+        if etag_matches(request, etag):
+            return not_modified(etag, settings.cache_control_product)
+        return ORJSONResponse(
+            dump_fields(ProductResponse, field_names, [product])[0],
+            headers=cache_headers(etag, settings.cache_control_product)
+        )
+    
+    cached = product_cache.get(product_id)
+    if cached is None:
+        generation = product_cache.generation
+        product = db.query(Product).filter(Product.id == product_id, Product.is_active == True).first()
+        if not product:
+            raise HTTPException(status_code=404, detail="Product not found")
+        etag = _product_etag(product)
+        if etag_matches(request, etag):
+            return not_modified(etag, settings.cache_control_product)
+        body = ProductResponse.model_validate(product).model_dump_json().encode()
+        product_cache.set(product_id, body, etag, generation)
+    else:
+        body, etag = cached
+        if etag_matches(request, etag):
+            return not_modified(etag, settings.cache_control_product)
+    # Already validated and serialized; bypass response_model re-validation
+    return Response(
+        content=body, media_type="application/json",
+        headers=cache_headers(etag, settings.cache_control_product)
+    )
+
+@app.post("/products/lookup", response_model=ProductLookupResult)
+async def lookup_products(
+    lookup: ProductLookup,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Get up to 500 products by id in one request.
+    Products come from the product cache where possible and the rest from a
+    single IN query. Results follow the request order; unknown or inactive
+    ids are null in products and listed in not_found.
+    """
+    requested = list(dict.fromkeys(lookup.ids))
+    bodies = {}
+    for product_id in requested:
+        cached = product_cache.get(product_id)
+        if cached is not None:
+            bodies[product_id] = cached[0]
+    
+    missing = [product_id for product_id in requested if product_id not in bodies]
+    if missing:
+        generation = product_cache.generation
+        for product in db.query(Product).filter(Product.id.in_(missing), Product.is_active == True):
+            body = ProductResponse.model_validate(product).model_dump_json().encode()
+            product_cache.set(product.id, body, _product_etag(product), generation)
+            bodies[product.id] = body
+    
+    # Cached bodies are already serialized ProductResponse JSON; splice them in as is
+    not_found = [product_id for product_id in requested if product_id not in bodies]
+    content = b"".join([
+        b'{"products":[', b",".join(bodies.get(product_id, b"null") for product_id in lookup.ids),
+        b'],"not_found":', json.dumps(not_found).encode(), b"}"
+    ])
+    return Response(content=content, media_type="application/json")
 
 @app.post("/products", response_model=ProductResponse, status_code=201)
 async def create_product(
@@ -813,9 +1183,11 @@ async def create_product(
         raise HTTPException(status_code=400, detail="SKU already exists")
     
     db_product = Product(**product_data.dict())
+    sync_product_tags(db_product)
     db.add(db_product)
     db.commit()
     db.refresh(db_product)
+    _product_changed(db_product.id)
     return db_product
 
 @app.put("/products/{product_id}", response_model=ProductResponse)
@@ -830,10 +1202,14 @@ async def update_product(
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     
-    for field, value in product_data.dict(exclude_unset=True).items():
+    update_data = product_data.dict(exclude_unset=True)
+    for field, value in update_data.items():
         setattr(product, field, value)
+    if "tags" in update_data:
+        sync_product_tags(product)
     
     db.commit()
+    _product_changed(product_id)
     db.refresh(product)
     return product
 
@@ -850,6 +1226,8 @@ async def delete_product(
     
     db.delete(product)
     db.commit()
+    _product_changed(product_id)
+    _reviews_changed(product_id)  # Its reviews were deleted with it
     return {"message": "Product deleted successfully"}
 
 # ============================================================================
@@ -858,18 +1236,18 @@ async def delete_product(
 
 @app.get("/cart", response_model=CartResponse)
 async def get_cart(
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_principal_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get user's cart"""
-    cart_items = db.query(CartItem).filter(CartItem.user_id == current_user.id).all()
+    cart_items = (await db.scalars(select(CartItem).where(CartItem.user_id == current_user.id))).all()
     
     # Convert cart items to response format with product details
     cart_items_data = []
     total_amount = 0
     
     for item in cart_items:
-        product = db.query(Product).filter(Product.id == item.product_id).first()
+        product = await db.get(Product, item.product_id)
         if product:
             price = product.sale_price if product.sale_price else product.price
             total_amount += price * item.quantity
@@ -897,12 +1275,14 @@ async def get_cart(
 @app.post("/cart", response_model=CartItemResponse, status_code=201)
 async def add_to_cart(
     cart_item: CartItemCreate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_principal_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Add item to cart"""
     # Check if product exists and is active
-    product = db.query(Product).filter(Product.id == cart_item.product_id, Product.is_active == True).first()
+    product = await db.scalar(
+        select(Product).where(Product.id == cart_item.product_id, Product.is_active == True)
+    )
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     
@@ -911,17 +1291,19 @@ async def add_to_cart(
         raise HTTPException(status_code=400, detail="Insufficient stock")
     
     # Check if item already in cart
-    existing_item = db.query(CartItem).filter(
-        CartItem.user_id == current_user.id,
-        CartItem.product_id == cart_item.product_id
-    ).first()
+    existing_item = await db.scalar(
+        select(CartItem).where(
+            CartItem.user_id == current_user.id,
+            CartItem.product_id == cart_item.product_id
+        )
+    )
     
     if existing_item:
         # Update quantity
         existing_item.quantity += cart_item.quantity
         existing_item.selected_options = cart_item.selected_options
-        db.commit()
-        db.refresh(existing_item)
+        await db.commit()
+        await db.refresh(existing_item)
         
         # Create response with product info
         result = CartItemResponse(
@@ -944,8 +1326,8 @@ async def add_to_cart(
             selected_options=cart_item.selected_options
         )
         db.add(db_cart_item)
-        db.commit()
-        db.refresh(db_cart_item)
+        await db.commit()
+        await db.refresh(db_cart_item)
         
         # Create response with product info
         result = CartItemResponse(
@@ -964,56 +1346,71 @@ async def add_to_cart(
 async def update_cart_item(
     item_id: int,
     cart_item_update: CartItemUpdate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_principal_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update cart item"""
-    cart_item = db.query(CartItem).filter(
-        CartItem.id == item_id,
-        CartItem.user_id == current_user.id
-    ).first()
+    cart_item = await db.scalar(
+        select(CartItem).where(
+            CartItem.id == item_id,
+            CartItem.user_id == current_user.id
+        )
+    )
     
     if not cart_item:
         raise HTTPException(status_code=404, detail="Cart item not found")
     
     # Check stock availability
-    product = db.query(Product).filter(Product.id == cart_item.product_id).first()
+    product = await db.get(Product, cart_item.product_id)
     if product and product.stock_quantity < cart_item_update.quantity:
         raise HTTPException(status_code=400, detail="Insufficient stock")
     
     cart_item.quantity = cart_item_update.quantity
     cart_item.selected_options = cart_item_update.selected_options
-    db.commit()
-    db.refresh(cart_item)
-    return cart_item
+    await db.commit()
+    await db.refresh(cart_item)
+    
+    # Build the response explicitly - the product relationship can't lazy load on an AsyncSession
+    return CartItemResponse(
+        id=cart_item.id,
+        user_id=cart_item.user_id,
+        product_id=cart_item.product_id,
+        quantity=cart_item.quantity,
+        selected_options=cart_item.selected_options,
+        added_at=cart_item.added_at,
+        updated_at=cart_item.updated_at,
+        product=product.to_dict() if product else None
+    )
 
 @app.delete("/cart/{item_id}")
 async def remove_from_cart(
     item_id: int,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_principal_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Remove item from cart"""
-    cart_item = db.query(CartItem).filter(
-        CartItem.id == item_id,
-        CartItem.user_id == current_user.id
-    ).first()
+    cart_item = await db.scalar(
+        select(CartItem).where(
+            CartItem.id == item_id,
+            CartItem.user_id == current_user.id
+        )
+    )
     
     if not cart_item:
         raise HTTPException(status_code=404, detail="Cart item not found")
     
-    db.delete(cart_item)
-    db.commit()
+    await db.delete(cart_item)
+    await db.commit()
     return {"message": "Item removed from cart"}
 
 @app.delete("/cart")
 async def clear_cart(
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_principal_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Clear user's cart"""
-    db.query(CartItem).filter(CartItem.user_id == current_user.id).delete()
-    db.commit()
+    await db.execute(delete(CartItem).where(CartItem.user_id == current_user.id))
+    await db.commit()
     return {"message": "Cart cleared"}
 
 # ============================================================================
@@ -1023,12 +1420,12 @@ async def clear_cart(
 @app.post("/orders", response_model=OrderResponse, status_code=201)
 async def create_order(
     order_data: OrderCreate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_principal_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new order"""
     # Validate cart items
-    cart_items = db.query(CartItem).filter(CartItem.user_id == current_user.id).all()
+    cart_items = (await db.scalars(select(CartItem).where(CartItem.user_id == current_user.id))).all()
     if not cart_items:
         raise HTTPException(status_code=400, detail="Cart is empty")
     
@@ -1037,7 +1434,7 @@ async def create_order(
     order_items = []
     
     for item in cart_items:
-        product = db.query(Product).filter(Product.id == item.product_id).first()
+        product = await db.get(Product, item.product_id)
         if not product or not product.is_active:
             raise HTTPException(status_code=400, detail=f"Product {item.product_id} not available")
         
@@ -1062,10 +1459,12 @@ async def create_order(
     # Apply coupon if provided
     discount_amount = 0
     if order_data.coupon_code:
-        coupon = db.query(Coupon).filter(
-            Coupon.code == order_data.coupon_code,
-            Coupon.is_active == True
-        ).first()
+        coupon = await db.scalar(
+            select(Coupon).where(
+                Coupon.code == order_data.coupon_code,
+                Coupon.is_active == True
+            )
+        )
         
         if coupon and coupon.valid_from <= datetime.utcnow() <= coupon.valid_until:
             if coupon.discount_type == "percentage":
@@ -1119,8 +1518,8 @@ async def create_order(
     db_order.customer_notes = order_data.customer_notes
     
     db.add(db_order)
-    db.commit()
-    db.refresh(db_order)
+    await db.commit()
+    await db.refresh(db_order)
     
     # Create order items
     for item_data in order_items:
@@ -1140,15 +1539,16 @@ async def create_order(
         db.add(db_order_item)
         
         # Update product stock
-        product = db.query(Product).filter(Product.id == item_data["product_id"]).first()
+        product = await db.get(Product, item_data["product_id"])
         product.stock_quantity -= item_data["quantity"]
         product.reserved_quantity += item_data["quantity"]
     
     # Clear cart
-    db.query(CartItem).filter(CartItem.user_id == current_user.id).delete()
+    await db.execute(delete(CartItem).where(CartItem.user_id == current_user.id))
     
-    db.commit()
-    db.refresh(db_order)
+    await db.commit()
+    _product_changed(*(item_data["product_id"] for item_data in order_items))
+    await db.refresh(db_order, attribute_names=["order_items"])
     
     return db_order
 
@@ -1157,29 +1557,39 @@ async def get_user_orders(
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
     status: Optional[OrderStatus] = Query(None),
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    fields: Optional[str] = Query(None, description="Comma-separated order fields to return, e.g. id,order_number,status,total_amount"),
+    current_user: User = Depends(get_current_principal_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get user's orders"""
-    query = db.query(Order).filter(Order.user_id == current_user.id)
+    field_names = parse_fields(fields, OrderResponse)
+    query = select(Order).where(Order.user_id == current_user.id)
+    if field_names:
+        query = query.options(load_fields(Order, field_names))
+    if not field_names or "order_items" in field_names:
+        query = query.options(selectinload(Order.order_items))
     
     if status:
-        query = query.filter(Order.status == status)
+        query = query.where(Order.status == status)
     
-    orders = query.order_by(Order.created_at.desc()).offset(skip).limit(limit).all()
+    orders = (await db.scalars(query.order_by(Order.created_at.desc()).offset(skip).limit(limit))).all()
+    if field_names:
+        return ORJSONResponse(dump_fields(OrderResponse, field_names, orders))
     return orders
 
 @app.get("/orders/{order_id}", response_model=OrderResponse)
 async def get_order(
     order_id: int,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_principal_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get order details"""
-    order = db.query(Order).filter(
-        Order.id == order_id,
-        Order.user_id == current_user.id
-    ).first()
+    order = await db.scalar(
+        select(Order).options(selectinload(Order.order_items)).where(
+            Order.id == order_id,
+            Order.user_id == current_user.id
+        )
+    )
     
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
@@ -1239,14 +1649,16 @@ async def admin_cancel_order(
 @app.delete("/orders/{order_id}")
 async def cancel_order(
     order_id: int,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_principal_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Cancel order"""
-    order = db.query(Order).filter(
-        Order.id == order_id,
-        Order.user_id == current_user.id
-    ).first()
+    order = await db.scalar(
+        select(Order).options(selectinload(Order.order_items)).where(
+            Order.id == order_id,
+            Order.user_id == current_user.id
+        )
+    )
     
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
@@ -1259,12 +1671,13 @@ async def cancel_order(
     
     # Restore product stock
     for item in order.order_items:
-        product = db.query(Product).filter(Product.id == item.product_id).first()
+        product = await db.get(Product, item.product_id)
         if product:
             product.stock_quantity += item.quantity
             product.reserved_quantity -= item.quantity
     
-    db.commit()
+    await db.commit()
+    _product_changed(*(item.product_id for item in order.order_items))
     return {"message": "Order cancelled successfully"}
 
 # ============================================================================
@@ -1311,6 +1724,7 @@ async def create_review(
     db.add(db_review)
     db.commit()
     db.refresh(db_review)
+    _reviews_changed(review_data.product_id)
     
     # Update product rating
     product_reviews = db.query(Review).filter(
@@ -1324,21 +1738,32 @@ async def create_review(
         product.total_reviews = len(product_reviews)
         product.total_ratings = total_rating
         db.commit()
+        _product_changed(review_data.product_id)
     
     return db_review
 
 @app.get("/reviews/{product_id}", response_model=List[ReviewResponse])
 async def get_product_reviews(
+    request: Request,
+    response: Response,
     product_id: int,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get product reviews"""
-    reviews = db.query(Review).filter(
+    approved = db.query(Review).filter(
         Review.product_id == product_id,
         Review.is_approved == True
-    ).order_by(Review.created_at.desc()).offset(skip).limit(limit).all()
+    )
+    # Any added, removed, edited or moderated review changes the count or the latest update
+    review_count, last_updated = approved.with_entities(func.count(Review.id), func.max(Review.updated_at)).one()
+    etag = make_etag("reviews", product_id, skip, limit, review_count, last_updated)
+    if etag_matches(request, etag):
+        return not_modified(etag, settings.cache_control_reviews)
+    response.headers.update(cache_headers(etag, settings.cache_control_reviews))
+    
+    reviews = approved.order_by(Review.created_at.desc()).offset(skip).limit(limit).all()
     
     return reviews
 
@@ -1363,6 +1788,7 @@ async def update_review(
     
     db.commit()
     db.refresh(review)
+    _reviews_changed(review.product_id)
     return review
 
 @app.delete("/admin/reviews/{review_id}")
@@ -1377,8 +1803,10 @@ async def admin_delete_review(
     if not review:
         raise HTTPException(status_code=404, detail="Review not found")
     
+    product_id = review.product_id
     db.delete(review)
     db.commit()
+    _reviews_changed(product_id)
     return {"message": "Review deleted successfully"}
 
 @app.delete("/reviews/{review_id}")
@@ -1396,8 +1824,10 @@ async def delete_review(
     if not review:
         raise HTTPException(status_code=404, detail="Review not found")
     
+    product_id = review.product_id
     db.delete(review)
     db.commit()
+    _reviews_changed(product_id)
     return {"message": "Review deleted successfully"}
 
 # ============================================================================
@@ -1532,10 +1962,21 @@ async def update_coupon(
 
 @app.get("/wishlist", response_model=List[WishlistItemResponse])
 async def get_wishlist(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """Get user's wishlist"""
+    # Additions and removals change the count or the newest id; product edits their updated_at
+    item_count, last_id, products_updated = db.query(
+        func.count(WishlistItem.id), func.max(WishlistItem.id), func.max(Product.updated_at)
+    ).outerjoin(Product, Product.id == WishlistItem.product_id).filter(WishlistItem.user_id == current_user.id).one()
+    etag = make_etag("wishlist", current_user.id, item_count, last_id, products_updated)
+    if etag_matches(request, etag):
+        return not_modified(etag, settings.cache_control_wishlist)
+    response.headers.update(cache_headers(etag, settings.cache_control_wishlist))
+    
     wishlist_items = db.query(WishlistItem).filter(WishlistItem.user_id == current_user.id).all()
     return wishlist_items
 
@@ -1681,7 +2122,7 @@ async def get_inventory(
     if low_stock:
         query = query.filter(Product.stock_quantity <= Product.min_stock_level)
     if category:
-        query = query.filter(Product.category == category)
+        query = query.filter(Product.category == category.value)
     
     products = query.offset(skip).limit(limit).all()
     
@@ -1733,6 +2174,7 @@ async def adjust_inventory(
         raise HTTPException(status_code=400, detail="Invalid adjustment type")
     
     db.commit()
+    _product_changed(product_id)
     
     return {
         "product_id": product_id,
@@ -1744,126 +2186,6 @@ async def adjust_inventory(
         "adjusted_at": datetime.utcnow().isoformat()
     }
 
-# ============================================================================
-# BATCH OPERATIONS ENDPOINTS
-# ============================================================================
-
-@app.post("/products/batch")
-async def batch_create_products(
-    products_data: List[dict],
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
-):
-    """Batch create products (admin only)"""
-    created_products = []
-    errors = []
-    
-    for i, product_data in enumerate(products_data):
-        try:
-            # Check if SKU already exists
-            if db.query(Product).filter(Product.sku == product_data.get("sku")).first():
-                errors.append({"index": i, "error": f"SKU {product_data.get('sku')} already exists"})
-                continue
-            
-            db_product = Product(**product_data)
-            db.add(db_product)
-            db.commit()
-            db.refresh(db_product)
-            created_products.append(db_product.id)
-            
-        except Exception as e:
-            errors.append({"index": i, "error": str(e)})
-            db.rollback()
-    
-    return {
-        "created_count": len(created_products),
-        "error_count": len(errors),
-        "created_product_ids": created_products,
-        "errors": errors
-    }
-
-@app.put("/products/batch")
-async def batch_update_products(
-    updates_data: List[dict],
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
-):
-    """Batch update products (admin only)"""
-    updated_products = []
-    errors = []
-    
-    for i, update_data in enumerate(updates_data):
-        try:
-            product_id = update_data.get("id")
-            if not product_id:
-                errors.append({"index": i, "error": "Product ID required"})
-                continue
-            
-            product = db.query(Product).filter(Product.id == product_id).first()
-            if not product:
-                errors.append({"index": i, "error": f"Product {product_id} not found"})
-                continue
-            
-            for field, value in update_data.items():
-                if field != "id" and hasattr(product, field):
-                    setattr(product, field, value)
-            
-            db.commit()
-            updated_products.append(product_id)
-            
-        except Exception as e:
-            errors.append({"index": i, "error": str(e)})
-            db.rollback()
-    
-    return {
-        "updated_count": len(updated_products),
-        "error_count": len(errors),
-        "updated_product_ids": updated_products,
-        "errors": errors
-    }
-
-@app.delete("/products/batch")
-async def batch_delete_products(
-    product_ids: List[int],
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
-):
-    """Batch delete products (admin only)"""
-    deleted_count = 0
-    errors = []
-    
-    for product_id in product_ids:
-        try:
-            product = db.query(Product).filter(Product.id == product_id).first()
-            if not product:
-                errors.append({"product_id": product_id, "error": "Product not found"})
-                continue
-            
-            # Check if product has active orders
-            active_orders = db.query(OrderItem).join(Order).filter(
-                OrderItem.product_id == product_id,
-                Order.status.in_([OrderStatus.PENDING, OrderStatus.CONFIRMED, OrderStatus.PROCESSING])
-            ).first()
-            
-            if active_orders:
-                errors.append({"product_id": product_id, "error": "Product has active orders"})
-                continue
-            
-            db.delete(product)
-            deleted_count += 1
-            
-        except Exception as e:
-            errors.append({"product_id": product_id, "error": str(e)})
-    
-    if deleted_count > 0:
-        db.commit()
-    
-    return {
-        "deleted_count": deleted_count,
-        "error_count": len(errors),
-        "errors": errors
-    }
-
 # ============================================================================
 # ADVANCED SEARCH ENDPOINTS
 # ============================================================================
@@ -1877,12 +2199,10 @@ async def advanced_product_search(
     query = db.query(Product).filter(Product.is_active == True)
     
     # Text search
+    search_rank = None
     if search_text := search_criteria.get("text"):
-        query = query.filter(
-            Product.name.contains(search_text) |
-            Product.description.contains(search_text) |
-            Product.brand.contains(search_text) |
-            Product.sku.contains(search_text)
+        query, search_rank = _apply_product_search(
+            query, search_text, [Product.name, Product.description, Product.brand, Product.sku]
         )
     
     # Price range
@@ -1913,16 +2233,29 @@ async def advanced_product_search(
     if min_rating := search_criteria.get("min_rating"):
         query = query.filter(Product.average_rating >= min_rating)
     
-    # Tags
+    # Tags - all of them by default, or any with "tags_match": "any" (indexed product_tags lookups)
     if tags := search_criteria.get("tags"):
-        for tag in tags:
-            query = query.filter(Product.tags.contains([tag]))
-    
-    # Sorting
-    sort_by = search_criteria.get("sort_by", "name")
+        tags_match = search_criteria.get("tags_match", "all")
+        if tags_match not in ("all", "any"):
+            raise HTTPException(status_code=400, detail="tags_match must be 'all' or 'any'")
+        query = query.filter(tag_filter(tags, tags_match))
+    
+    # Facet counts under the filters above, all facets in one statement
+    facet_counts = None
+    requested_facets = search_criteria.get("facets")
+    if isinstance(requested_facets, list):
+        requested_facets = ",".join(requested_facets)
+    if facet_names := parse_facets(requested_facets):
+        rows = db.execute(facet_counts_query(query.statement, facet_names)).all()
+        facet_counts = build_facets(rows, facet_names)
+    
+    # Sorting - best text matches first unless a sort is requested
+    sort_by = search_criteria.get("sort_by", "relevance" if search_rank is not None else "name")
     sort_order = search_criteria.get("sort_order", "asc")
     
-    if hasattr(Product, sort_by):
+    if sort_by == "relevance" and search_rank is not None:
+        query = query.order_by(search_rank, Product.id)
+    elif hasattr(Product, sort_by):
         sort_column = getattr(Product, sort_by)
         if sort_order == "desc":
             query = query.order_by(sort_column.desc())
@@ -1933,8 +2266,38 @@ async def advanced_product_search(
     skip = search_criteria.get("skip", 0)
     limit = search_criteria.get("limit", 20)
     
-    total = query.count()
-    products = query.offset(skip).limit(limit).all()
+    # Sparse fieldset: load and return only these product fields
+    field_names = parse_fields(search_criteria.get("fields"), ProductResponse)
+    load_options = [load_fields(Product, field_names)] if field_names else []
+    
+    if (catalog_index.ready and not search_text and not tags
+            and stock_status in (None, "in_stock", "out_of_stock") and sort_by in CATALOG_SORT_KEYS):
+        # Structured filters only: filter and order in the column store, read just the page
+        price_range = price_range or {}
+        page_ids, total = catalog_index.search(
+            categories=categories or None,
+            brands=brands or None,
+            min_price=price_range.get("min") or None,
+            max_price=price_range.get("max") or None,
+            min_rating=min_rating or None,
+            in_stock={"in_stock": True, "out_of_stock": False}.get(stock_status),
+            sort=sort_by,
+            descending=sort_order == "desc",
+            offset=skip,
+            limit=limit
+        )
+        found = {
+            product.id: product
+            for product in db.query(Product).options(*load_options).filter(
+                Product.id.in_(page_ids), Product.is_active == True
+            )
+        } if page_ids else {}
+        products = [found[product_id] for product_id in page_ids if product_id in found]
+    else:
+        total = query.count()
+        products = query.options(*load_options).offset(skip).limit(limit).all()
+    if field_names:
+        products = dump_fields(ProductResponse, field_names, products)
     
     return {
         "products": products,
@@ -1942,6 +2305,7 @@ async def advanced_product_search(
         "page": skip // limit + 1,
         "per_page": limit,
         "total_pages": (total + limit - 1) // limit,
+        "facets": facet_counts,
         "search_criteria": search_criteria
     }
 
@@ -1949,36 +2313,23 @@ async def advanced_product_search(
 async def search_suggestions(
     q: str = Query(..., min_length=2),
     type: str = Query("all", regex="^(all|products|brands|categories)$"),
-    limit: int = Query(10, ge=1, le=50),
-    db: Session = Depends(get_db)
+    limit: int = Query(10, ge=1, le=50, description="Capped at AUTOCOMPLETE_TOP_K, the completions kept per prefix"),
 ):
-    """Get search suggestions"""
+    """Get search suggestions (served from the in-memory autocomplete index)"""
+    limit = min(limit, settings.autocomplete_top_k)
     suggestions = []
     
     if type in ["all", "products"]:
         # Product name suggestions
-        products = db.query(Product.name).filter(
-            Product.name.contains(q),
-            Product.is_active == True
-        ).limit(limit).all()
-        suggestions.extend([{"type": "product", "value": p.name} for p in products])
+        suggestions.extend([{"type": "product", "value": name} for name in autocomplete.suggest(q, "product", limit)])
     
     if type in ["all", "brands"]:
         # Brand suggestions
-        brands = db.query(Product.brand).filter(
-            Product.brand.contains(q),
-            Product.is_active == True
-        ).distinct().limit(limit).all()
-        suggestions.extend([{"type": "brand", "value": b.brand} for b in brands])
+        suggestions.extend([{"type": "brand", "value": brand} for brand in autocomplete.suggest(q, "brand", limit)])
     
     if type in ["all", "categories"]:
         # Category suggestions (enum values)
-        category_matches = [
-            {"type": "category", "value": cat.value}
-            for cat in ProductCategory
-            if q.lower() in cat.value.lower()
-        ]
-        suggestions.extend(category_matches[:limit])
+        suggestions.extend([{"type": "category", "value": category} for category in autocomplete.suggest(q, "category", limit)])
     
     return {"suggestions": suggestions[:limit]}
 
@@ -1992,7 +2343,7 @@ async def sales_analytics(
     end_date: Optional[str] = Query(None),
     group_by: str = Query("day", regex="^(day|week|month|year)$"),
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get sales analytics (admin only)"""
     query = db.query(Order).filter(Order.status == OrderStatus.DELIVERED)
@@ -2032,7 +2383,7 @@ async def sales_analytics(
     total_orders = sum(data["orders"] for data in sales_data.values())
     total_items = sum(data["items"] for data in sales_data.values())
     
-    return {
+    return ORJSONResponse({
         "sales_data": sales_data,
         "summary": {
             "total_revenue": total_revenue,
@@ -2042,14 +2393,14 @@ async def sales_analytics(
             "period": f"{start_date or 'all'} to {end_date or 'all'}",
             "group_by": group_by
         }
-    }
+    })
 
 @app.get("/analytics/products/top-selling")
 async def top_selling_products(
     limit: int = Query(10, ge=1, le=100),
     period_days: int = Query(30, ge=1, le=365),
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get top selling products (admin only)"""
     cutoff_date = datetime.utcnow() - timedelta(days=period_days)
@@ -2083,16 +2434,16 @@ async def top_selling_products(
             "average_price": float(result.total_revenue) / result.total_sold
         })
     
-    return {
+    return ORJSONResponse({
         "top_products": top_products,
         "period_days": period_days,
         "total_products": len(top_products)
-    }
+    })
 
 @app.get("/analytics/customers/insights")
 async def customer_insights(
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get customer insights and segmentation (admin only)"""
     # Customer value analysis
@@ -2134,7 +2485,7 @@ async def customer_insights(
         if stat.total_orders == 1:
             new_customers.append(customer_data)
     
-    return {
+    return ORJSONResponse({
         "high_value_customers": sorted(high_value_customers, key=lambda x: x["total_spent"], reverse=True)[:20],
         "repeat_customers": sorted(repeat_customers, key=lambda x: x["total_orders"], reverse=True)[:20],
         "new_customers": sorted(new_customers, key=lambda x: x["last_order_date"], reverse=True)[:20],
@@ -2144,7 +2495,7 @@ async def customer_insights(
             "repeat_customer_count": len(repeat_customers),
             "new_customer_count": len(new_customers)
         }
-    }
+    })
 
 # ============================================================================
 # FILE UPLOAD ENDPOINTS
@@ -2191,6 +2542,7 @@ async def upload_product_images(
         product.thumbnail = new_urls[0]
     
     db.commit()
+    _product_changed(product_id)
     
     return {
         "product_id": product_id,
@@ -2468,7 +2820,7 @@ async def low_stock_report(
     query = db.query(Product).filter(Product.is_active == True)
     
     if category:
-        query = query.filter(Product.category == category)
+        query = query.filter(Product.category == category.value)
     
     products = query.all()
     
@@ -2597,6 +2949,7 @@ async def sync_products_from_external(
                 # Update existing product
                 existing_product.price = ext_product["price"]
                 existing_product.name = ext_product["name"]
+                db.commit()
                 synced_products.append({"action": "updated", "product_id": existing_product.id, "sku": ext_product["sku"]})
             elif not existing_product:
                 # Create new product
@@ -2604,10 +2957,10 @@ async def sync_products_from_external(
                     name=ext_product["name"],
                     price=ext_product["price"],
                     sku=ext_product["sku"],
-                    category=ProductCategory.ELECTRONICS if ext_product["category"] == "electronics" else ProductCategory.CLOTHING,
-                    stock_quantity=100,  # Default stock
+                    category=(ProductCategory.ELECTRONICS if ext_product["category"] == "electronics" else ProductCategory.CLOTHING).value,
                     description=f"Product synced from {external_system}"
                 )
+                new_product.stock_quantity = 100  # Default stock
                 db.add(new_product)
                 db.commit()
                 db.refresh(new_product)
@@ -2615,7 +2968,9 @@ async def sync_products_from_external(
                 
         except Exception as e:
             errors.append({"sku": ext_product["sku"], "error": str(e)})
+            db.rollback()
     
+    _product_changed(*(synced["product_id"] for synced in synced_products))
     return {
         "sync_summary": {
             "total_processed": len(external_products),
@@ -2638,16 +2993,24 @@ async def admin_list_orders(
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
     status: Optional[OrderStatus] = Query(None),
+    fields: Optional[str] = Query(None, description="Comma-separated order fields to return"),
     current_user: User = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """List all orders (admin only)"""
+    field_names = parse_fields(fields, OrderResponse)
     query = db.query(Order)
+    if field_names:
+        query = query.options(load_fields(Order, field_names))
+        if "order_items" in field_names:
+            query = query.options(selectinload(Order.order_items))
     
     if status:
         query = query.filter(Order.status == status)
     
     orders = query.order_by(Order.created_at.desc()).offset(skip).limit(limit).all()
+    if field_names:
+        return ORJSONResponse(dump_fields(OrderResponse, field_names, orders))
     return orders
 
 @app.get("/admin/reviews", response_model=List[ReviewResponse])
@@ -2672,12 +3035,13 @@ async def admin_list_reviews(
     for review in reviews:
         product = db.query(Product).filter(Product.id == review.product_id).first()
         review_dict = review.to_dict()
-        if product:
-            review_dict['product'] = product.to_dict()
-            review_dict['product_name'] = product.name
+        review_dict['user'] = None
+        review_dict['product'] = product.to_dict() if product else None
+        review_dict['product_name'] = product.name if product else None
         result.append(review_dict)
     
-    return result
+    # Dicts already have the ReviewResponse shape; skip re-validation
+    return ORJSONResponse(result)
 
 @app.put("/admin/reviews/{review_id}/approve")
 async def approve_review(
@@ -2693,6 +3057,7 @@ async def approve_review(
     review.is_approved = True
     review.approved_at = datetime.utcnow()
     db.commit()
+    _reviews_changed(review.product_id)
     
     return {"message": "Review approved successfully"}
 
@@ -2709,6 +3074,7 @@ async def reject_review(
     
     review.is_approved = False
     db.commit()
+    _reviews_changed(review.product_id)
     
     return {"message": "Review rejected successfully"}
 
@@ -2792,6 +3158,57 @@ async def admin_stats(
         }
     }
 
+@app.get("/admin/perf/slow-queries")
+async def admin_slow_queries(
+    limit: int = Query(20, ge=1, le=100),
+    sort_by: str = Query("total_time_ms", regex="^(total_time_ms|avg_time_ms|max_time_ms|count)$"),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Get the slowest statements grouped by normalized SQL, with query plans (admin only)"""
+    return {
+        "threshold_ms": settings.slow_query_threshold_ms,
+        "dropped": slow_query_log.dropped,
+        "statements": slow_query_log.top_statements(limit=limit, sort_by=sort_by)
+    }
+
+@app.get("/admin/perf/password-pool")
+async def admin_password_pool_stats(current_user: User = Depends(get_current_admin_user)):
+    """Get password hashing pool utilisation (admin only)"""
+    return password_pool.stats()
+
+@app.get("/admin/perf/caches")
+async def admin_cache_stats(current_user: User = Depends(get_current_admin_user)):
+    """Get hit/miss statistics of the in-process caches (admin only)"""
+    return {
+        "token_cache": token_cache.stats(),
+        "product_cache": product_cache.stats(),
+        "autocomplete_entries": autocomplete.stats(),
+        "catalog_index": catalog_index.stats(),
+        "response_cache": response_cache.stats()
+    }
+
+@app.delete("/admin/perf/caches")
+async def admin_clear_caches(current_user: User = Depends(get_current_admin_user)):
+    """Clear the in-process caches (admin only)"""
+    clear_token_cache()
+    product_cache.clear()
+    response_cache.clear()
+    return {"message": "Caches cleared"}
+
+@app.post("/admin/perf/caches/purge")
+async def admin_purge_response_cache(
+    tags: List[str],
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Purge cached public responses by surrogate tag, e.g. ["catalog", "product:42"] (admin only)"""
+    return {"purged": response_cache.purge(*tags)}
+
+@app.delete("/admin/perf/slow-queries")
+async def admin_clear_slow_queries(current_user: User = Depends(get_current_admin_user)):
+    """Clear the captured slow statements (admin only)"""
+    slow_query_log.clear()
+    return {"message": "Slow query log cleared"}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -1,8 +1,8 @@
 """
 E-commerce Models
 """
-from .user import User, UserRole
-from .product import Product, ProductCategory
+from .user import User, UserRole, UserTokenVersion
+from .product import Product, ProductCategory, ProductTag
 from .order import Order, OrderItem, OrderStatus, PaymentMethod, PaymentStatus
 from .cart import CartItem
 from .review import Review
@@ -12,8 +12,8 @@ from .refund import Refund
 from .inventory import InventoryTransaction
 
 __all__ = [
-    "User", "UserRole",
-    "Product", "ProductCategory", 
+    "User", "UserRole", "UserTokenVersion",
+    "Product", "ProductCategory", "ProductTag",
     "Order", "OrderItem", "OrderStatus", "PaymentMethod", "PaymentStatus",
     "CartItem", "Review", "Coupon", "OrderCoupon", "WishlistItem", 
     "Refund", "InventoryTransaction"
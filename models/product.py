@@ -1,7 +1,7 @@
 """
 Product Model for E-commerce Testing API
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum, JSON, Float, Text, Index
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum, JSON, Float, Text, Index, ForeignKey
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -107,6 +107,7 @@ class Product(Base):
     reviews = relationship("Review", back_populates="product", cascade="all, delete-orphan")
     wishlist_items = relationship("WishlistItem", back_populates="product", cascade="all, delete-orphan")
     inventory_transactions = relationship("InventoryTransaction", back_populates="product", cascade="all, delete-orphan")
+    tag_links = relationship("ProductTag", back_populates="product", cascade="all, delete-orphan")
     
     # Indexes for better performance
     __table_args__ = (
@@ -114,6 +115,10 @@ class Product(Base):
         Index('idx_product_price_range', 'price'),
         Index('idx_product_stock_status', 'stock_quantity', 'is_active'),
         Index('idx_product_featured', 'is_featured', 'is_active'),
+        # Keyset pagination for the listing sorts (sort key, then id)
+        Index('idx_product_active_price', 'is_active', 'price', 'id'),
+        Index('idx_product_active_rating', 'is_active', 'average_rating', 'id'),
+        Index('idx_product_active_created', 'is_active', 'created_at', 'id'),
     )
     
     def __init__(self, name: str, price: float, category: ProductCategory, sku: str, 
@@ -252,3 +257,26 @@ class Product(Base):
     
     def __repr__(self):
         return f"<Product(id={self.id}, name='{self.name}', sku='{self.sku}')>"
+
+class ProductTag(Base):
+    """One row per (product, tag): the indexed, normalized form of Product.tags"""
+    __tablename__ = "product_tags"
+    
+    product_id = Column(Integer, ForeignKey('products.id', ondelete='CASCADE'), primary_key=True)
+    tag = Column(String(100), primary_key=True)
+    
+    # Relationships
+    product = relationship("Product", back_populates="tag_links")
+    
+    # Tag lookups: products carrying a tag, in id order
+    __table_args__ = (
+        Index('idx_product_tag_tag_product', 'tag', 'product_id'),
+    )
+    
+    def __init__(self, tag: str, product_id: int = None):
+        """Initialize product tag"""
+        self.tag = tag
+        self.product_id = product_id
+    
+    def __repr__(self):
+        return f"<ProductTag(product_id={self.product_id}, tag='{self.tag}')>"
@@ -4,14 +4,11 @@ User Model for E-commerce Testing API
 from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum, JSON, Text
 from sqlalchemy.orm import relationship
 from datetime import datetime, timedelta
-from passlib.context import CryptContext
 import secrets
 from database import Base
+from services.password_service import hash_password, verify_password
 import enum
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=12)
-
 class UserRole(enum.Enum):
     CUSTOMER = "customer"
     ADMIN = "admin"
@@ -63,11 +60,16 @@ class User(Base):
     wishlist_items = relationship("WishlistItem", back_populates="user", cascade="all, delete-orphan")
     
     def __init__(self, email: str, username: str, password: str, first_name: str, 
-                 last_name: str, phone: str = None, role: UserRole = UserRole.CUSTOMER):
-        """Initialize user with required fields"""
+                 last_name: str, phone: str = None, role: UserRole = UserRole.CUSTOMER,
+                 password_hash: str = None):
+        """Initialize user with required fields (password_hash skips hashing `password`)"""
         self.email = email
         self.username = username
-        self.set_password(password)
+        if password_hash:
+            self.password_hash = password_hash
+            self.last_password_change = datetime.utcnow()
+        else:
+            self.set_password(password)
         self.first_name = first_name
         self.last_name = last_name
         self.phone = phone
@@ -77,14 +79,14 @@ class User(Base):
     def set_password(self, password: str):
         """Hash and set password"""
         if password:
-            self.password_hash = pwd_context.hash(password)
+            self.password_hash = hash_password(password)
             self.last_password_change = datetime.utcnow()
     
     def verify_password(self, password: str) -> bool:
         """Check if provided password matches hash"""
         if not self.password_hash:
             return False
-        return pwd_context.verify(password, self.password_hash)
+        return verify_password(password, self.password_hash)
     
     def generate_verification_token(self):
         """Generate a unique email verification token"""
@@ -163,3 +165,19 @@ class User(Base):
     
     def __repr__(self):
         return f"<User(id={self.id}, email='{self.email}', username='{self.username}')>"
+
+class UserTokenVersion(Base):
+    """
+    Per-user token version, embedded in JWTs as the "ver" claim.
+    Bumping it revokes every token issued before. Kept in its own table (and
+    without a foreign key) so rows survive user deletion and existing
+    databases pick it up through create_all.
+    """
+    __tablename__ = "user_token_versions"
+    
+    user_id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<UserTokenVersion(user_id={self.user_id}, version={self.version})>"
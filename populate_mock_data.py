@@ -11,14 +11,12 @@ from models.order import OrderItem
 from models.review import Review
 from models.coupon import Coupon, DiscountType
 from datetime import datetime, timedelta
-from passlib.context import CryptContext
+from services.password_service import hash_password
 import random
 import json
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 def get_hashed_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return hash_password(password)
 
 def create_mock_data():
     """Create comprehensive mock data"""
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Build or rebuild the full-text product search index (SQLite FTS5).
+
+The API creates the index on startup and triggers keep it in sync, so this is
+only needed for catalogs loaded with triggers disabled, after restoring a
+database file, or to compact the index after heavy churn.
+
+Usage:
+    python rebuild_search_index.py
+"""
+import sys
+import time
+from database import engine, init_db
+from services.product_search import product_search
+
+def main():
+    init_db()
+    if not product_search.install(engine):
+        print("Full-text search is only available on SQLite builds with FTS5")
+        sys.exit(1)
+
+    started = time.perf_counter()
+    product_search.rebuild(engine)
+    print(f"Search index rebuilt in {time.perf_counter() - started:.2f}s")
+
+if __name__ == "__main__":
+    main()
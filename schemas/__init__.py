@@ -1,5 +1,5 @@
 from .user import UserCreate, UserUpdate, UserResponse, UserLogin, UserProfile
-from .product import ProductCreate, ProductUpdate, ProductResponse, ProductList
+from .product import ProductCreate, ProductUpdate, ProductResponse, ProductList, ProductLookup, ProductLookupResult
 from .order import OrderCreate, OrderUpdate, OrderResponse, OrderItemCreate, OrderItemResponse
 from .cart import CartItemCreate, CartItemUpdate, CartItemResponse, CartResponse
 from .review import ReviewCreate, ReviewUpdate, ReviewResponse
@@ -9,7 +9,7 @@ from .refund import RefundCreate, RefundUpdate, RefundResponse
 
 __all__ = [
     "UserCreate", "UserUpdate", "UserResponse", "UserLogin", "UserProfile",
-    "ProductCreate", "ProductUpdate", "ProductResponse", "ProductList",
+    "ProductCreate", "ProductUpdate", "ProductResponse", "ProductList", "ProductLookup", "ProductLookupResult",
     "OrderCreate", "OrderUpdate", "OrderResponse", "OrderItemCreate", "OrderItemResponse",
     "CartItemCreate", "CartItemUpdate", "CartItemResponse", "CartResponse",
     "ReviewCreate", "ReviewUpdate", "ReviewResponse",
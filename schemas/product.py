@@ -172,9 +172,22 @@ class ProductResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class FacetValue(BaseModel):
+    value: str
+    count: int
+
 class ProductList(BaseModel):
     products: List[ProductResponse]
-    total: int
-    page: int
+    total: Optional[int] = None  # Omitted unless requested in cursor mode
+    page: Optional[int] = None  # Only with skip-based pagination
     per_page: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None  # Pass as `cursor` to fetch the next page
+    facets: Optional[Dict[str, List[FacetValue]]] = None  # Only when requested with `facets`
+
+class ProductLookup(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=500, description="Product ids, at most 500")
+
+class ProductLookupResult(BaseModel):
+    products: List[Optional[ProductResponse]]  # In request order; null where the id wasn't found
+    not_found: List[int]
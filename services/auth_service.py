@@ -1,29 +1,39 @@
 from datetime import datetime, timedelta
 from typing import Optional, Union
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from fastapi import HTTPException, status, Depends
+from fastapi import HTTPException, status, Depends, BackgroundTasks
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_db, get_async_db, AsyncSessionLocal
 from models import User, UserRole
 from schemas.user import UserCreate, UserLogin, TokenResponse, UserResponse
+from services.token_versions import token_versions
+from services.cache import LRUCache
+from services.password_service import password_pool, verify_password, password_needs_update
+from services.password_service import hash_password as get_password_hash
 from config import settings
+import hashlib
 import secrets
-
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+import time
 
 # JWT token handling
 security = HTTPBearer()
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+# Decoded token payloads by SHA-256 digest of the token, so the signature is
+# checked once per token rather than once per request. Entries never outlive
+# the token's exp claim.
+token_cache = LRUCache(settings.token_cache_size, ttl=settings.token_cache_ttl_seconds)
+_token_cache_secret = settings.jwt_secret_key
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the password worker pool (503 when saturated)"""
+    return await password_pool.run(verify_password, plain_password, hashed_password)
 
-def get_password_hash(password: str) -> str:
-    """Hash a password"""
-    return pwd_context.hash(password)
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password on the password worker pool (503 when saturated)"""
+    return await password_pool.run(get_password_hash, password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token"""
@@ -45,11 +55,25 @@ def create_refresh_token(data: dict) -> str:
     encoded_jwt = jwt.encode(to_encode, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
     return encoded_jwt
 
+def clear_token_cache():
+    """Drop all cached token payloads (e.g. after rotating jwt_secret_key)"""
+    global _token_cache_secret
+    token_cache.clear()
+    _token_cache_secret = settings.jwt_secret_key
+
 def verify_token(token: str) -> dict:
     """Verify JWT token and return payload"""
+    if _token_cache_secret != settings.jwt_secret_key:
+        # Secret rotated: cached payloads were verified with the old key
+        clear_token_cache()
+
+    token_digest = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(token_digest)
+    if payload is not None:
+        return payload
+
     try:
         payload = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
-        return payload
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -57,14 +81,40 @@ def verify_token(token: str) -> dict:
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get current authenticated user"""
-    token = credentials.credentials
+    ttl = settings.token_cache_ttl_seconds
+    if payload.get("exp") is not None:
+        ttl = min(ttl, payload["exp"] - time.time())
+    token_cache.set(token_digest, payload, ttl=ttl)
+    return payload
+
+class Principal:
+    """
+    Authenticated user as asserted by a signed access token (stateless auth mode).
+    Carries only what the token proves; load the User when more is needed.
+    """
+    is_active = True
+
+    def __init__(self, id: int, email: Optional[str], role: UserRole):
+        self.id = id
+        self.email = email
+        self.role = role
+
+    def __repr__(self):
+        return f"<Principal(id={self.id}, role='{self.role.value}')>"
+
+def check_token_version(payload: dict, user_id) -> None:
+    """Reject tokens issued before the user's token version was bumped"""
+    if payload.get("ver", 0) < token_versions.get(int(user_id)):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+def _get_token_payload(token: str) -> dict:
+    """Decode the bearer token, requiring a subject and a current token version"""
     payload = verify_token(token)
-    user_id: int = payload.get("sub")
+    user_id = payload.get("sub")
     
     if user_id is None:
         raise HTTPException(
@@ -72,8 +122,24 @@ async def get_current_user(
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    user = db.query(User).filter(User.id == user_id).first()
+    check_token_version(payload, user_id)
+    return payload
+
+def _get_user_id_from_token(token: str):
+    """Decode the bearer token and return its subject (user id)"""
+    return _get_token_payload(token)["sub"]
+
+def _get_principal_from_token(token: str) -> Principal:
+    """Build the principal from the token claims alone"""
+    payload = _get_token_payload(token)
+    try:
+        role = UserRole(payload.get("role", UserRole.CUSTOMER.value))
+    except ValueError:
+        role = UserRole.CUSTOMER
+    return Principal(id=int(payload["sub"]), email=payload.get("email"), role=role)
+
+def _check_authenticated_user(user: Optional[User]) -> User:
+    """Reject missing or inactive users resolved from a token"""
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -90,13 +156,58 @@ async def get_current_user(
     
     return user
 
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> User:
+    """Get current authenticated user"""
+    user_id = _get_user_id_from_token(credentials.credentials)
+    user = db.query(User).filter(User.id == user_id).first()
+    return _check_authenticated_user(user)
+
+async def get_current_user_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """Get current authenticated user through the async session"""
+    user_id = _get_user_id_from_token(credentials.credentials)
+    user = await db.get(User, int(user_id))
+    return _check_authenticated_user(user)
+
 async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     """Get current active user"""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
-async def get_current_admin_user(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_active_user_async(current_user: User = Depends(get_current_user_async)) -> User:
+    """Get current active user through the async session"""
+    if not current_user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return current_user
+
+async def get_current_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> Union[User, Principal]:
+    """
+    Get the authenticated user for endpoints that only need its id and role.
+    With settings.auth_stateless the signed token is trusted and no query runs.
+    """
+    if settings.auth_stateless:
+        return _get_principal_from_token(credentials.credentials)
+    return await get_current_user(credentials, db)
+
+async def get_current_principal_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> Union[User, Principal]:
+    """Get the authenticated user for endpoints that only need its id and role (async session)"""
+    if settings.auth_stateless:
+        return _get_principal_from_token(credentials.credentials)
+    return await get_current_user_async(credentials, db)
+
+async def get_current_admin_user(current_user: User = Depends(get_current_principal)) -> User:
     """Get current admin user"""
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(
@@ -105,7 +216,7 @@ async def get_current_admin_user(current_user: User = Depends(get_current_user))
         )
     return current_user
 
-async def get_current_moderator_user(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_moderator_user(current_user: User = Depends(get_current_principal)) -> User:
     """Get current moderator or admin user"""
     if current_user.role not in [UserRole.ADMIN, UserRole.MODERATOR]:
         raise HTTPException(
@@ -123,8 +234,18 @@ def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
         return None
     return user
 
-def register_user(db: Session, user_data: UserCreate) -> User:
-    """Register a new user"""
+async def authenticate_user_async(db: AsyncSession, email: str, password: str) -> Optional[User]:
+    """Authenticate user with email and password through the async session"""
+    result = await db.execute(select(User).where(User.email == email).limit(1))
+    user = result.scalars().first()
+    if not user:
+        return None
+    if not await verify_password_async(password, user.password_hash):
+        return None
+    return user
+
+def check_registration_available(db: Session, user_data: UserCreate):
+    """Raise 400 when the email or username is already registered"""
     # Check if email already exists
     if db.query(User).filter(User.email == user_data.email).first():
         raise HTTPException(
@@ -138,6 +259,16 @@ def register_user(db: Session, user_data: UserCreate) -> User:
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already taken"
         )
+
+def register_user(
+    db: Session, user_data: UserCreate, password_hash: Optional[str] = None, check_existing: bool = True
+) -> User:
+    """
+    Register a new user (pass password_hash when the password was already hashed,
+    and check_existing=False when check_registration_available already ran)
+    """
+    if check_existing:
+        check_registration_available(db, user_data)
     
     # Create new user - use User constructor which will hash the password
     # The User.__init__ expects 'password' (not password_hash) and will hash it
@@ -163,7 +294,8 @@ def register_user(db: Session, user_data: UserCreate) -> User:
         first_name=user_data.first_name,
         last_name=user_data.last_name,
         phone=user_data.phone,
-        role=user_role
+        role=user_role,
+        password_hash=password_hash
     )
     # User.__init__ already sets email_verification_token via generate_verification_token()
     
@@ -172,109 +304,166 @@ def register_user(db: Session, user_data: UserCreate) -> User:
     db.refresh(db_user)
     return db_user
 
+def _check_login_user(user: Optional[User]) -> User:
+    """Reject failed or inactive logins"""
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect email or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Inactive user",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
+
+def _build_token_response(user: User) -> TokenResponse:
+    """Create access/refresh tokens and the response body for a logged-in user"""
+    # Normalise role to lowercase string for tokens and schema
+    # Handle both enum objects and string values from database
+    raw_role = getattr(user, "role", None)
+    
+    if raw_role is None:
+        role_str = "customer"
+    elif hasattr(raw_role, "value"):
+        # It's an enum object, get its value
+        role_str = str(raw_role.value).lower()
+    elif hasattr(raw_role, "name"):
+        # It's an enum but we got the name instead of value
+        # Map enum names to values
+        role_name = str(raw_role.name).upper()
+        role_map = {
+            "CUSTOMER": "customer",
+            "ADMIN": "admin",
+            "MODERATOR": "moderator",
+            "SUPPORT": "support"
+        }
+        role_str = role_map.get(role_name, "customer")
+    else:
+        # It's a string or something else
+        role_str = str(raw_role).lower()
+    
+    # Final normalization - ensure it's lowercase
+    role_str = role_str.lower().strip()
+    
+    # Validate it's a valid role, default to customer if not
+    valid_roles = ["customer", "admin", "moderator", "support"]
+    if role_str not in valid_roles:
+        print(f"Warning: Invalid role '{role_str}', defaulting to 'customer'")
+        role_str = "customer"
+
+    # Create tokens
+    access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
+    token_version = token_versions.get(user.id)
+    access_token = create_access_token(
+        data={"sub": str(user.id), "email": user.email, "role": role_str, "ver": token_version},
+        expires_delta=access_token_expires,
+    )
+
+    refresh_token = create_refresh_token(
+        data={"sub": str(user.id), "email": user.email, "ver": token_version}
+    )
+
+    # Convert user to UserResponse - handle enum conversion safely
+    from schemas.user import UserRole as SchemaUserRole
+
+    # Ensure role_str is valid before creating enum (should already be validated above)
+    if role_str not in ["customer", "admin", "moderator", "support"]:
+        print(f"Warning: Invalid role '{role_str}', defaulting to 'customer'")
+        role_str = "customer"
+    
+    try:
+        schema_role = SchemaUserRole(role_str)
+    except (ValueError, TypeError) as e:
+        # Fallback to customer if something unexpected is stored
+        print(f"Error creating SchemaUserRole from '{role_str}': {e}")
+        schema_role = SchemaUserRole.CUSTOMER
+
+    user_dict = {
+        "id": user.id,
+        "email": user.email,
+        "username": user.username,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "role": schema_role,
+        "is_active": user.is_active,
+        "is_verified": user.is_verified,
+        "is_email_verified": user.is_email_verified,
+        "created_at": user.created_at,
+        "last_login": user.last_login,
+    }
+    user_response = UserResponse(**user_dict)
+
+    return TokenResponse(
+        access_token=access_token,
+        token_type="bearer",
+        expires_in=settings.access_token_expire_minutes * 60,
+        refresh_token=refresh_token,
+        user=user_response,
+    )
+
 def login_user(db: Session, user_data: UserLogin) -> TokenResponse:
     """Login user and return tokens"""
     try:
-        user = authenticate_user(db, user_data.email, user_data.password)
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Incorrect email or password",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-
-        if not user.is_active:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Inactive user",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
+        user = _check_login_user(authenticate_user(db, user_data.email, user_data.password))
 
         # Update last login
         user.last_login = datetime.utcnow()
         db.commit()
 
-        # Normalise role to lowercase string for tokens and schema
-        # Handle both enum objects and string values from database
-        raw_role = getattr(user, "role", None)
-        
-        if raw_role is None:
-            role_str = "customer"
-        elif hasattr(raw_role, "value"):
-            # It's an enum object, get its value
-            role_str = str(raw_role.value).lower()
-        elif hasattr(raw_role, "name"):
-            # It's an enum but we got the name instead of value
-            # Map enum names to values
-            role_name = str(raw_role.name).upper()
-            role_map = {
-                "CUSTOMER": "customer",
-                "ADMIN": "admin",
-                "MODERATOR": "moderator",
-                "SUPPORT": "support"
-            }
-            role_str = role_map.get(role_name, "customer")
-        else:
-            # It's a string or something else
-            role_str = str(raw_role).lower()
-        
-        # Final normalization - ensure it's lowercase
-        role_str = role_str.lower().strip()
-        
-        # Validate it's a valid role, default to customer if not
-        valid_roles = ["customer", "admin", "moderator", "support"]
-        if role_str not in valid_roles:
-            print(f"Warning: Invalid role '{role_str}', defaulting to 'customer'")
-            role_str = "customer"
-
-        # Create tokens
-        access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
-        access_token = create_access_token(
-            data={"sub": str(user.id), "email": user.email, "role": role_str},
-            expires_delta=access_token_expires,
+        return _build_token_response(user)
+    except HTTPException:
+        # Re-raise HTTP exceptions
+        raise
+    except Exception as e:
+        # Log the full error for debugging
+        import traceback
+        error_trace = traceback.format_exc()
+        print(f"Login error in login_user: {str(e)}")
+        print(f"Traceback: {error_trace}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Login failed: {str(e)}",
         )
 
-        refresh_token = create_refresh_token(
-            data={"sub": str(user.id), "email": user.email}
+async def rehash_password(user_id: int, old_hash: str, password: str):
+    """Re-hash a password with the current work factor after a successful login"""
+    try:
+        new_hash = await get_password_hash_async(password)
+    except HTTPException:
+        # Pool saturated; the next login will try again
+        return
+    async with AsyncSessionLocal() as db:
+        # Only replace the hash that was verified, never a password changed meanwhile
+        await db.execute(
+            update(User)
+            .where(User.id == user_id, User.password_hash == old_hash)
+            .values(password_hash=new_hash)
         )
+        await db.commit()
 
-        # Convert user to UserResponse - handle enum conversion safely
-        from schemas.user import UserRole as SchemaUserRole
-
-        # Ensure role_str is valid before creating enum (should already be validated above)
-        if role_str not in ["customer", "admin", "moderator", "support"]:
-            print(f"Warning: Invalid role '{role_str}', defaulting to 'customer'")
-            role_str = "customer"
-        
-        try:
-            schema_role = SchemaUserRole(role_str)
-        except (ValueError, TypeError) as e:
-            # Fallback to customer if something unexpected is stored
-            print(f"Error creating SchemaUserRole from '{role_str}': {e}")
-            schema_role = SchemaUserRole.CUSTOMER
-
-        user_dict = {
-            "id": user.id,
-            "email": user.email,
-            "username": user.username,
-            "first_name": user.first_name,
-            "last_name": user.last_name,
-            "role": schema_role,
-            "is_active": user.is_active,
-            "is_verified": user.is_verified,
-            "is_email_verified": user.is_email_verified,
-            "created_at": user.created_at,
-            "last_login": user.last_login,
-        }
-        user_response = UserResponse(**user_dict)
-
-        return TokenResponse(
-            access_token=access_token,
-            token_type="bearer",
-            expires_in=settings.access_token_expire_minutes * 60,
-            refresh_token=refresh_token,
-            user=user_response,
-        )
+async def login_user_async(
+    db: AsyncSession,
+    user_data: UserLogin,
+    background_tasks: Optional[BackgroundTasks] = None
+) -> TokenResponse:
+    """Login user and return tokens through the async session"""
+    try:
+        user = _check_login_user(await authenticate_user_async(db, user_data.email, user_data.password))
+
+        # Upgrade hashes made with another work factor once the response is sent
+        if background_tasks is not None and password_needs_update(user.password_hash):
+            background_tasks.add_task(rehash_password, user.id, user.password_hash, user_data.password)
+
+        # Update last login
+        user.last_login = datetime.utcnow()
+        await db.commit()
+
+        return _build_token_response(user)
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
@@ -282,7 +471,7 @@ def login_user(db: Session, user_data: UserLogin) -> TokenResponse:
         # Log the full error for debugging
         import traceback
         error_trace = traceback.format_exc()
-        print(f"Login error in login_user: {str(e)}")
+        print(f"Login error in login_user_async: {str(e)}")
         print(f"Traceback: {error_trace}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -0,0 +1,283 @@
+"""
+In-memory autocomplete for /search/suggestions.
+
+One prefix trie per suggestion kind (product names, brands, categories).
+Every node caches the top-k entries below it by popularity, so a lookup is a
+walk down the query's characters plus a slice. Names are indexed from every
+word, so "pro" completes "iPad Pro 12.9".
+
+Popularity is units sold (cancelled orders excluded), ties broken by average
+rating; brands and categories sum the popularity of their products. The index
+is built at startup and refreshed per product by a background thread after
+product writes, so lookups never touch the database. The same thread rebuilds
+it every settings.autocomplete_rebuild_seconds to pick up writes made outside
+the API (scripts, other workers).
+"""
+import heapq
+import logging
+import queue
+import re
+import threading
+import time
+from sqlalchemy import select, func
+from database import SessionLocal
+from models import Product, ProductCategory, Order, OrderItem, OrderStatus
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Longest indexed key; longer queries are matched on their first characters
+MAX_KEY_LENGTH = 40
+
+_WORD = re.compile(r"[^\W_]+", re.UNICODE)
+
+def normalize(text: str) -> str:
+    """Lowercase words separated by single spaces"""
+    return " ".join(_WORD.findall(text.lower()))
+
+def _word_suffixes(text: str) -> list:
+    """Keys under which a value is indexed: the text starting at each word"""
+    words = normalize(text).split(" ")
+    return [" ".join(words[i:])[:MAX_KEY_LENGTH] for i in range(len(words)) if words[i]]
+
+def popularity(units_sold: int, average_rating: float) -> float:
+    """Units sold, with rating (0-5) as a fractional tie-breaker"""
+    return (units_sold or 0) + (average_rating or 0) / 10
+
+class _Node:
+    __slots__ = ("children", "terminals", "top")
+
+    def __init__(self):
+        self.children = {}
+        self.terminals = {}  # entry key -> (score, value) for entries whose key ends here
+        self.top = []  # best (score, value, entry key) in this subtree, best first
+
+class PrefixTrie:
+    """Trie with per-node top-k caches; entries may be indexed under several keys"""
+
+    def __init__(self, top_k: int):
+        self.top_k = top_k
+        self.root = _Node()
+        self.entries = {}  # entry key -> (score, value, index keys)
+
+    def _recompute(self, node: _Node):
+        candidates = [(score, value, key) for key, (score, value) in node.terminals.items()]
+        for child in node.children.values():
+            candidates.extend(child.top)
+        node.top = heapq.nlargest(self.top_k, candidates)
+
+    def _path(self, key: str, create: bool) -> list:
+        node, path = self.root, [self.root]
+        for char in key:
+            child = node.children.get(char)
+            if child is None:
+                if not create:
+                    return []
+                child = node.children[char] = _Node()
+            node = child
+            path.append(node)
+        return path
+
+    def upsert(self, entry_key, value: str, score: float, recompute: bool = True):
+        """Add or replace an entry"""
+        self.remove(entry_key, recompute=recompute)
+        index_keys = _word_suffixes(value)
+        if not index_keys:
+            return
+        self.entries[entry_key] = (score, value, index_keys)
+        for index_key in index_keys:
+            path = self._path(index_key, create=True)
+            path[-1].terminals[entry_key] = (score, value)
+            if recompute:
+                for node in reversed(path):
+                    self._recompute(node)
+
+    def remove(self, entry_key, recompute: bool = True):
+        """Remove an entry if present"""
+        entry = self.entries.pop(entry_key, None)
+        if entry is None:
+            return
+        for index_key in entry[2]:
+            path = self._path(index_key, create=False)
+            if not path:
+                continue
+            path[-1].terminals.pop(entry_key, None)
+            if recompute:
+                for node in reversed(path):
+                    self._recompute(node)
+
+    def recompute_all(self):
+        """Fill every node's top-k after bulk upserts with recompute=False"""
+        stack = [(self.root, False)]
+        while stack:
+            node, children_done = stack.pop()
+            if children_done:
+                self._recompute(node)
+            else:
+                stack.append((node, True))
+                stack.extend((child, False) for child in node.children.values())
+
+    def complete(self, prefix: str, limit: int) -> list:
+        """Distinct values of the best entries under the prefix"""
+        node = self.root
+        for char in normalize(prefix)[:MAX_KEY_LENGTH]:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        values = []
+        for _, value, _ in node.top:
+            if value not in values:
+                values.append(value)
+                if len(values) == limit:
+                    break
+        return values
+
+class AutocompleteIndex:
+    """Product, brand and category tries kept in sync with the catalog"""
+
+    KINDS = ("product", "brand", "category")
+
+    def __init__(self, session_factory, top_k: int, rebuild_seconds: float = 300):
+        self.session_factory = session_factory
+        self.top_k = top_k
+        self.rebuild_seconds = rebuild_seconds
+        self.tries = {kind: PrefixTrie(top_k) for kind in self.KINDS}
+        self.ready = False
+        # Per-product contributions to brand/category popularity
+        self._products = {}  # product id -> (brand, category, score)
+        self._groups = {"brand": {}, "category": {}}  # group key -> (total score, product count)
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._worker = None
+
+    def _load_products(self, db, product_ids=None) -> list:
+        units_sold = (
+            select(OrderItem.product_id, func.sum(OrderItem.quantity).label("units_sold"))
+            .join(Order, Order.id == OrderItem.order_id)
+            .where(Order.status != OrderStatus.CANCELLED)
+            .group_by(OrderItem.product_id)
+        )
+        if product_ids is not None:
+            units_sold = units_sold.where(OrderItem.product_id.in_(product_ids))
+        units_sold = units_sold.subquery()
+        query = select(
+            Product.id, Product.name, Product.brand, Product.category, Product.average_rating,
+            func.coalesce(units_sold.c.units_sold, 0).label("units_sold")
+        ).outerjoin(units_sold, units_sold.c.product_id == Product.id).where(Product.is_active == True)
+        if product_ids is not None:
+            query = query.where(Product.id.in_(product_ids))
+        return db.execute(query).all()
+
+    def _add_to_group(self, kind: str, group_key: str, score: float, count: int):
+        """Adjust a brand/category total by one product's score (count is +1 or -1)"""
+        totals = self._groups[kind]
+        total, size = totals.get(group_key, (0.0, 0))
+        totals[group_key] = (total + score * count, size + count)
+
+    def _upsert_group(self, kind: str, group_key: str, recompute: bool):
+        total, size = self._groups[kind][group_key]
+        if size <= 0 and kind == "brand":
+            del self._groups[kind][group_key]
+            self.tries[kind].remove(group_key, recompute=recompute)
+        else:
+            self.tries[kind].upsert(group_key, group_key, total, recompute=recompute)
+
+    def _apply(self, product_id: int, row, recompute: bool) -> set:
+        """
+        Update the product trie and group totals for one product (row None =
+        removed or inactive). Returns the (kind, group) entries to re-score.
+        """
+        changed_groups = set()
+        previous = self._products.pop(product_id, None)
+        if previous is not None:
+            brand, category, score = previous
+            for kind, group_key in (("brand", brand), ("category", category)):
+                if group_key:
+                    self._add_to_group(kind, group_key, score, -1)
+                    changed_groups.add((kind, group_key))
+        if row is None:
+            self.tries["product"].remove(product_id, recompute=recompute)
+            return changed_groups
+
+        score = popularity(row.units_sold, row.average_rating)
+        self._products[product_id] = (row.brand, row.category, score)
+        self.tries["product"].upsert(product_id, row.name, score, recompute=recompute)
+        for kind, group_key in (("brand", row.brand), ("category", row.category)):
+            if group_key:
+                self._add_to_group(kind, group_key, score, 1)
+                changed_groups.add((kind, group_key))
+        return changed_groups
+
+    def build(self):
+        """Index the whole active catalog"""
+        db = self.session_factory()
+        try:
+            rows = self._load_products(db)
+        finally:
+            db.close()
+        # Built aside and swapped in, so lookups during a rebuild see the old tries
+        fresh = AutocompleteIndex(self.session_factory, self.top_k)
+        # Categories are suggested even before they have products
+        fresh._groups["category"] = {category.value: (0.0, 0) for category in ProductCategory}
+        for row in rows:
+            fresh._apply(row.id, row, recompute=False)
+        for kind in ("brand", "category"):
+            for group_key in list(fresh._groups[kind]):
+                fresh._upsert_group(kind, group_key, recompute=False)
+        for trie in fresh.tries.values():
+            trie.recompute_all()
+        with self._lock:
+            self.tries, self._products, self._groups = fresh.tries, fresh._products, fresh._groups
+            self.ready = True
+
+    def refresh_products(self, *product_ids: int):
+        """Re-read changed products in the background and update the tries"""
+        if product_ids:
+            self._queue.put(product_ids)
+
+    def start(self):
+        """Build the index and start the background refresher"""
+        self.build()
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name="autocomplete-refresh", daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        next_rebuild = time.monotonic() + self.rebuild_seconds
+        while True:
+            try:
+                product_ids = set(self._queue.get(timeout=max(0.0, next_rebuild - time.monotonic())))
+            except queue.Empty:
+                try:
+                    self.build()
+                except Exception as e:
+                    logger.error("Autocomplete rebuild failed: %s", e)
+                next_rebuild = time.monotonic() + self.rebuild_seconds
+                continue
+            # Coalesce refreshes queued meanwhile (e.g. an order touching many products)
+            while not self._queue.empty():
+                product_ids.update(self._queue.get_nowait())
+            try:
+                db = self.session_factory()
+                try:
+                    rows = {row.id: row for row in self._load_products(db, list(product_ids))}
+                finally:
+                    db.close()
+                with self._lock:
+                    changed_groups = set()
+                    for product_id in product_ids:
+                        changed_groups |= self._apply(product_id, rows.get(product_id), recompute=True)
+                    for kind, group_key in changed_groups:
+                        self._upsert_group(kind, group_key, recompute=True)
+            except Exception as e:
+                logger.error("Autocomplete refresh failed for products %s: %s", sorted(product_ids), e)
+
+    def suggest(self, prefix: str, kind: str, limit: int) -> list:
+        """Top completions of one kind"""
+        return self.tries[kind].complete(prefix, limit)
+
+    def stats(self) -> dict:
+        """Entry counts per kind"""
+        return {kind: len(trie.entries) for kind, trie in self.tries.items()}
+
+autocomplete = AutocompleteIndex(SessionLocal, settings.autocomplete_top_k, settings.autocomplete_rebuild_seconds)
@@ -0,0 +1,35 @@
+"""
+Streaming NDJSON export of the product catalog.
+
+Products are read in id order with yield_per, so rows arrive from the cursor
+in fixed-size batches. Each batch is serialized to one chunk and expunged
+from the session before the next is fetched, keeping memory flat no matter
+how large the catalog is.
+"""
+from datetime import datetime
+from typing import Iterator, Optional
+from sqlalchemy import select
+from database import ReadSessionLocal
+from models import Product
+from schemas import ProductResponse
+from config import settings
+
+def export_products_ndjson(updated_since: Optional[datetime] = None, batch_size: Optional[int] = None) -> Iterator[bytes]:
+    """Yield active products as newline-delimited ProductResponse JSON, one chunk per batch"""
+    batch_size = batch_size or settings.catalog_export_batch_size
+    query = select(Product).where(Product.is_active == True)
+    if updated_since is not None:
+        query = query.where(Product.updated_at >= updated_since)
+    query = query.order_by(Product.id).execution_options(yield_per=batch_size)
+
+    # Own session: the stream outlives the request's dependencies
+    db = ReadSessionLocal()
+    try:
+        for batch in db.scalars(query).partitions():
+            chunk = b"".join(ProductResponse.model_validate(product).model_dump_json().encode() + b"\n" for product in batch)
+            # expunge_all() would invalidate the identity map the open result still uses
+            for product in batch:
+                db.expunge(product)
+            yield chunk
+    finally:
+        db.close()
@@ -0,0 +1,332 @@
+"""
+Columnar in-memory index of the product catalog.
+
+The hot filter and sort fields of every product are kept in NumPy arrays, one
+per column, so a listing is a handful of boolean masks plus a partial sort of
+the matching positions. Only the ids of the requested page are returned; the
+caller hydrates those rows from the database with one primary-key lookup.
+
+Product writes queue the changed ids for a background thread that updates
+the arrays in place, and the same thread rebuilds the whole index
+periodically (dropping deleted rows and picking up writes made outside the
+API, e.g. populate_mock_data.py).
+"""
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import select
+from database import SessionLocal
+from models import Product
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = datetime(1970, 1, 1, microsecond=1) - _EPOCH
+
+# Array dtypes per column; category and brand are dictionary-encoded
+COLUMNS = {
+    "id": np.int64,
+    "price": np.float64,
+    "average_rating": np.float64,
+    "stock_quantity": np.int64,
+    "created_at": np.int64,  # Microseconds since the epoch
+    "category": np.int32,
+    "brand": np.int32,  # -1 when the product has no brand
+    "is_featured": np.bool_,
+    "is_on_sale": np.bool_,
+    "is_active": np.bool_,
+    "name": object,
+}
+
+# Columns a listing can be ordered by
+SORT_KEYS = ("id", "price", "average_rating", "created_at", "stock_quantity", "name")
+
+def _timestamp(value: Optional[datetime]) -> int:
+    """Datetime as integer microseconds, comparable with the created_at column"""
+    if value is None:
+        return 0
+    return (value.replace(tzinfo=None) - _EPOCH) // _MICROSECOND
+
+class CatalogIndex:
+    """NumPy column store over products with vectorized filtering and sorting"""
+
+    def __init__(self, session_factory, rebuild_seconds: int):
+        self.session_factory = session_factory
+        self.rebuild_seconds = rebuild_seconds
+        self.ready = False
+        self.size = 0  # Rows in use; arrays are allocated with spare capacity
+        self.columns = {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self._positions = {}  # product id -> row
+        self._vocab = {"category": {}, "brand": {}}  # value -> code
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._worker = None
+        self.built_at = None
+        self.build_ms = None
+        self.updates = 0
+        self.version = 0  # Bumped whenever the indexed data changes
+        self._listeners = []
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    def _load_rows(self, db, product_ids=None) -> list:
+        query = select(
+            Product.id, Product.price, Product.average_rating, Product.stock_quantity, Product.created_at,
+            Product.category, Product.brand, Product.is_featured, Product.is_on_sale, Product.is_active,
+            Product.name
+        )
+        if product_ids is not None:
+            query = query.where(Product.id.in_(product_ids))
+        return db.execute(query.order_by(Product.id)).all()
+
+    @staticmethod
+    def _code(vocab: dict, value) -> int:
+        if value is None:
+            return -1
+        code = vocab.get(value)
+        if code is None:
+            code = vocab[value] = len(vocab)
+        return code
+
+    def _row_values(self, row, vocab: dict) -> tuple:
+        return (
+            row.id,
+            row.price or 0.0,
+            row.average_rating or 0.0,
+            row.stock_quantity or 0,
+            _timestamp(row.created_at),
+            self._code(vocab["category"], row.category),
+            self._code(vocab["brand"], row.brand),
+            bool(row.is_featured),
+            bool(row.is_on_sale),
+            bool(row.is_active),
+            row.name or "",
+        )
+
+    def build(self):
+        """Load every product into fresh arrays and swap them in"""
+        started = time.perf_counter()
+        db = self.session_factory()
+        try:
+            rows = self._load_rows(db)
+        finally:
+            db.close()
+
+        vocab = {"category": {}, "brand": {}}
+        values = [self._row_values(row, vocab) for row in rows]
+        columns = {}
+        for index, (name, dtype) in enumerate(COLUMNS.items()):
+            columns[name] = np.array([value[index] for value in values], dtype=dtype)
+        positions = {product_id: position for position, product_id in enumerate(columns["id"].tolist())}
+
+        with self._lock:
+            self.columns = columns
+            self.size = len(values)
+            self._positions = positions
+            self._vocab = vocab
+            self.built_at = datetime.utcnow()
+            self.build_ms = round((time.perf_counter() - started) * 1000, 2)
+            self.version += 1
+            self.ready = True
+        self._notify()
+
+    def _grow(self):
+        capacity = max(1024, len(self.columns["id"]) * 2)
+        for name, array in self.columns.items():
+            grown = np.empty(capacity, dtype=array.dtype)
+            grown[:self.size] = array[:self.size]
+            self.columns[name] = grown
+
+    def _apply(self, product_id: int, row):
+        """Write one product's row in place (row None = deleted); caller holds the lock"""
+        position = self._positions.get(product_id)
+        if row is None:
+            if position is not None:
+                # Rows are reclaimed by the next full rebuild
+                self.columns["is_active"][position] = False
+            return
+        if position is None:
+            if self.size == len(self.columns["id"]):
+                self._grow()
+            position = self._positions[product_id] = self.size
+            self.size += 1
+        for name, value in zip(COLUMNS, self._row_values(row, self._vocab)):
+            self.columns[name][position] = value
+
+    def add_listener(self, callback):
+        """Call callback() after every change to the indexed data"""
+        self._listeners.append(callback)
+
+    def _notify(self):
+        for callback in self._listeners:
+            try:
+                callback()
+            except Exception as e:
+                logger.error("Catalog index listener failed: %s", e)
+
+    def refresh_products(self, *product_ids: int):
+        """Re-read changed products in the background and update the arrays"""
+        if product_ids:
+            self._queue.put(product_ids)
+
+    def start(self):
+        """Build the index and start the background refresher"""
+        if not settings.catalog_index_enabled:
+            return
+        self.build()
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name="catalog-index-refresh", daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        next_rebuild = time.monotonic() + self.rebuild_seconds
+        while True:
+            try:
+                product_ids = set(self._queue.get(timeout=max(0.0, next_rebuild - time.monotonic())))
+            except queue.Empty:
+                try:
+                    self.build()
+                except Exception as e:
+                    logger.error("Catalog index rebuild failed: %s", e)
+                next_rebuild = time.monotonic() + self.rebuild_seconds
+                continue
+            # Coalesce refreshes queued meanwhile (e.g. an order touching many products)
+            while not self._queue.empty():
+                product_ids.update(self._queue.get_nowait())
+            try:
+                db = self.session_factory()
+                try:
+                    rows = {row.id: row for row in self._load_rows(db, list(product_ids))}
+                finally:
+                    db.close()
+                with self._lock:
+                    for product_id in product_ids:
+                        self._apply(product_id, rows.get(product_id))
+                    self.updates += len(product_ids)
+                    self.version += 1
+                self._notify()
+            except Exception as e:
+                logger.error("Catalog index refresh failed for products %s: %s", sorted(product_ids), e)
+
+    # ------------------------------------------------------------------
+    # Querying
+    # ------------------------------------------------------------------
+
+    def _codes(self, kind: str, values: Iterable) -> List[int]:
+        vocab = self._vocab[kind]
+        return [vocab[value] for value in values if value in vocab]
+
+    def _mask(self, categories, brands, min_price, max_price, min_rating, featured, on_sale, in_stock):
+        columns, size = self.columns, self.size
+        mask = columns["is_active"][:size].copy()
+        if categories is not None:
+            mask &= np.isin(columns["category"][:size], self._codes("category", categories))
+        if brands is not None:
+            mask &= np.isin(columns["brand"][:size], self._codes("brand", brands))
+        if min_price is not None:
+            mask &= columns["price"][:size] >= min_price
+        if max_price is not None:
+            mask &= columns["price"][:size] <= max_price
+        if min_rating is not None:
+            mask &= columns["average_rating"][:size] >= min_rating
+        if featured is not None:
+            mask &= columns["is_featured"][:size] == featured
+        if on_sale is not None:
+            mask &= columns["is_on_sale"][:size] == on_sale
+        if in_stock is not None:
+            stock = columns["stock_quantity"][:size]
+            mask &= (stock > 0) if in_stock else (stock == 0)
+        return mask
+
+    def _order(self, positions, sort: str, descending: bool, count: int):
+        """First `count` of the positions ordered by (sort key, id), both reversed when descending"""
+        ids = self.columns["id"][positions]
+        if sort == "id":
+            keys = -ids if descending else ids
+            if count < len(keys):
+                top = np.argpartition(keys, count - 1)[:count]
+                return positions[top[np.argsort(keys[top])]]
+            return positions[np.argsort(keys)]
+
+        keys = self.columns[sort][positions]
+        if keys.dtype == object:
+            order = np.argsort(ids, kind="stable")
+            order = order[np.argsort(keys[order], kind="stable")]
+            return positions[order[::-1][:count] if descending else order[:count]]
+
+        if descending:
+            keys, ids = -keys, -ids
+        if count < len(keys):
+            # Only rows up to the count-th smallest key (ties included) can make the page
+            threshold = keys[np.argpartition(keys, count - 1)[count - 1]]
+            candidates = np.flatnonzero(keys <= threshold)
+            positions, keys, ids = positions[candidates], keys[candidates], ids[candidates]
+        return positions[np.lexsort((ids, keys))][:count]
+
+    def search(
+        self,
+        categories: Optional[Iterable[str]] = None,
+        brands: Optional[Iterable[str]] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_rating: Optional[float] = None,
+        featured: Optional[bool] = None,
+        on_sale: Optional[bool] = None,
+        in_stock: Optional[bool] = None,
+        sort: str = "id",
+        descending: bool = False,
+        after: Optional[Tuple] = None,
+        offset: int = 0,
+        limit: int = 20,
+        count_total: bool = True,
+    ) -> Tuple[List[int], Optional[int]]:
+        """
+        Ids of one page of active products matching the filters, in order, and
+        the number of matches (None unless count_total). `after` is the
+        (sort value, id) of the previous page's last row for keyset paging.
+        """
+        with self._lock:
+            mask = self._mask(categories, brands, min_price, max_price, min_rating, featured, on_sale, in_stock)
+            total = int(np.count_nonzero(mask)) if count_total else None
+            if after is not None:
+                value, last_id = after
+                ids = self.columns["id"][:self.size]
+                if sort == "id":
+                    mask &= (ids < last_id) if descending else (ids > last_id)
+                else:
+                    keys = self.columns[sort][:self.size]
+                    if sort == "created_at":
+                        value = _timestamp(value)
+                    if descending:
+                        mask &= (keys < value) | ((keys == value) & (ids < last_id))
+                    else:
+                        mask &= (keys > value) | ((keys == value) & (ids > last_id))
+            positions = np.flatnonzero(mask)
+            count = min(offset + limit, len(positions))
+            if count <= offset:
+                return [], total
+            page = self._order(positions, sort, descending, count)[offset:]
+            return self.columns["id"][page].tolist(), total
+
+    def stats(self) -> dict:
+        """Row counts and build/refresh counters"""
+        with self._lock:
+            active = int(np.count_nonzero(self.columns["is_active"][:self.size]))
+            return {
+                "ready": self.ready,
+                "rows": self.size,
+                "active": active,
+                "built_at": self.built_at.isoformat() if self.built_at else None,
+                "build_ms": self.build_ms,
+                "updates": self.updates,
+                "pending_refreshes": self._queue.qsize(),
+            }
+
+catalog_index = CatalogIndex(SessionLocal, settings.catalog_index_rebuild_seconds)
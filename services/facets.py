@@ -0,0 +1,101 @@
+"""
+Facet counts for product listings.
+
+All requested facets are counted in one statement: the filtered listing query
+becomes a CTE and each facet is a GROUP BY over it, combined with UNION ALL.
+"""
+from typing import List, Optional
+from fastapi import HTTPException
+from sqlalchemy import String, Integer, case, cast, func, literal, select, union_all
+from models import Product
+from config import settings
+
+FACET_NAMES = ("category", "brand", "price", "rating", "in_stock")
+
+def parse_facets(facets: Optional[str]) -> List[str]:
+    """Validate a comma-separated facet list (400 on unknown names)"""
+    if not facets:
+        return []
+    names = [name.strip() for name in facets.split(",") if name.strip()]
+    unknown = [name for name in names if name not in FACET_NAMES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown facets {unknown}, expected any of {list(FACET_NAMES)}")
+    return list(dict.fromkeys(names))
+
+def _price_bucket(price_column):
+    """CASE expression labelling each price with its bucket ("0-25", ..., "1000+")"""
+    bounds = settings.facet_price_buckets
+    whens = []
+    lower = 0
+    for upper in bounds:
+        whens.append((price_column < upper, f"{lower:g}-{upper:g}"))
+        lower = upper
+    return case(*whens, else_=f"{lower:g}+")
+
+def _facet_value(name: str, filtered):
+    if name == "category":
+        return cast(filtered.c.category, String)
+    if name == "brand":
+        return cast(filtered.c.brand, String)
+    if name == "price":
+        return _price_bucket(filtered.c.price)
+    if name == "rating":
+        # Whole stars; cumulative "N and up" counts are derived afterwards
+        return cast(cast(func.coalesce(filtered.c.average_rating, 0), Integer), String)
+    if name == "in_stock":
+        return case((filtered.c.stock_quantity > 0, "true"), else_="false")
+
+def facet_counts_query(filtered_query, names: List[str]):
+    """
+    Single UNION ALL statement of (facet, value, count) rows for a filtered
+    product select (filters and joins only, no ordering or paging).
+    """
+    filtered = filtered_query.with_only_columns(
+        Product.category, Product.brand, Product.price, Product.average_rating, Product.stock_quantity,
+        maintain_column_froms=True
+    ).cte("filtered_products")
+    selects = []
+    for name in names:
+        value = _facet_value(name, filtered).label("value")
+        selects.append(
+            select(literal(name).label("facet"), value, func.count().label("count"))
+            .select_from(filtered)
+            .group_by(value)
+        )
+    return union_all(*selects)
+
+def build_facets(rows, names: List[str]) -> dict:
+    """Shape (facet, value, count) rows into {facet: [{"value", "count"}, ...]}"""
+    counts = {name: {} for name in names}
+    for facet, value, count in rows:
+        counts[facet][value] = count
+
+    result = {}
+    for name in names:
+        values = counts[name]
+        if name == "rating":
+            # "4" means 4 stars and up
+            result[name] = [
+                {"value": str(stars), "count": sum(c for v, c in values.items() if v is not None and int(v) >= stars)}
+                for stars in range(4, 0, -1)
+            ]
+        elif name == "price":
+            labels = _price_labels()
+            result[name] = [{"value": label, "count": values.get(label, 0)} for label in labels]
+        elif name == "in_stock":
+            result[name] = [{"value": key, "count": values.get(key, 0)} for key in ("true", "false")]
+        else:
+            ordered = sorted(
+                ((value, count) for value, count in values.items() if value is not None),
+                key=lambda item: (-item[1], item[0])
+            )
+            result[name] = [{"value": value, "count": count} for value, count in ordered[:settings.facet_max_values]]
+    return result
+
+def _price_labels() -> List[str]:
+    labels, lower = [], 0
+    for upper in settings.facet_price_buckets:
+        labels.append(f"{lower:g}-{upper:g}")
+        lower = upper
+    labels.append(f"{lower:g}+")
+    return labels
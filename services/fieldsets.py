@@ -0,0 +1,51 @@
+"""
+Sparse fieldsets: ?fields=id,name,price returns only those fields.
+
+The requested names are validated against the response schema, the query
+loads only the matching columns (load_only), and rows are serialized through
+a schema trimmed to the same fields, so values are formatted exactly as in
+the full response.
+"""
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple, Type, Union
+from fastapi import HTTPException
+from pydantic import BaseModel, ConfigDict, create_model
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only
+
+def parse_fields(fields: Optional[Union[str, List[str]]], schema: Type[BaseModel]) -> Optional[Tuple[str, ...]]:
+    """
+    Validate a comma-separated field list (or a list) against the schema (400 on unknown
+    names). Returns the fields in schema order with "id" always included, or
+    None when no fieldset was requested.
+    """
+    if not fields:
+        return None
+    if isinstance(fields, (list, tuple)):
+        names = {str(name).strip() for name in fields}
+    else:
+        names = {name.strip() for name in fields.split(",")}
+    names.discard("")
+    unknown = sorted(names - set(schema.model_fields))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields {unknown}")
+    names.add("id")
+    return tuple(name for name in schema.model_fields if name in names)
+
+@lru_cache(maxsize=256)
+def partial_schema(schema: Type[BaseModel], fields: Tuple[str, ...]) -> Type[BaseModel]:
+    """The schema restricted to the given fields (cached per field set)"""
+    definitions = {name: (schema.model_fields[name].annotation, schema.model_fields[name]) for name in fields}
+    return create_model(
+        f"{schema.__name__}Fields", __config__=ConfigDict(from_attributes=True), **definitions
+    )
+
+def load_fields(model, fields: Iterable[str], *extra: str):
+    """load_only() option for the model's columns behind the fields, plus extra columns the endpoint needs"""
+    columns = inspect(model).column_attrs
+    return load_only(*(getattr(model, name) for name in dict.fromkeys((*fields, *extra)) if name in columns))
+
+def dump_fields(schema: Type[BaseModel], fields: Tuple[str, ...], objects: Iterable) -> list:
+    """JSON-ready dicts of only the requested fields"""
+    partial = partial_schema(schema, fields)
+    return [partial.model_validate(obj).model_dump(mode="json") for obj in objects]
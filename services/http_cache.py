@@ -0,0 +1,51 @@
+"""
+ETags and conditional GET helpers.
+
+Endpoints derive a weak ETag from whatever versions their response (a row's
+updated_at, an aggregate over child rows, the catalog generation) and check
+If-None-Match before loading or serializing the body, answering 304 when the
+client's copy is current.
+"""
+import hashlib
+import uuid
+from typing import Optional
+from fastapi import Request, Response
+
+# Distinguishes ETags built from process-local counters (the catalog
+# generation), so a tag issued by one worker never matches on another
+INSTANCE_ID = uuid.uuid4().hex[:8]
+
+def make_etag(*parts) -> str:
+    """Weak ETag over the given version parts"""
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether If-None-Match names this ETag (weak comparison)"""
+    return if_none_match(request.headers.get("if-none-match"), etag)
+
+def if_none_match(header: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header value names this ETag (weak comparison)"""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+def cache_headers(etag: str, cache_control: Optional[str]) -> dict:
+    """ETag and Cache-Control response headers"""
+    headers = {"ETag": etag}
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+    return headers
+
+def not_modified(etag: str, cache_control: Optional[str]) -> Response:
+    """Empty 304 response carrying the validators"""
+    return Response(status_code=304, headers=cache_headers(etag, cache_control))
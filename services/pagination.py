@@ -0,0 +1,54 @@
+"""
+Opaque keyset pagination cursors.
+
+A cursor records the sort it belongs to and the sort key of the last row
+returned (sort value + id), so the next page starts with a WHERE on an
+indexed key instead of OFFSET.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Tuple
+from fastapi import HTTPException
+
+def encode_cursor(sort: str, value: Any, last_id: int) -> str:
+    """Encode the position after (value, last_id) for the given sort"""
+    if isinstance(value, datetime):
+        value = {"dt": value.isoformat()}
+    raw = json.dumps({"s": sort, "v": value, "id": last_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+# Type of the sort value carried by each sort's cursors
+_SORT_VALUE_TYPES = {
+    "id": int,
+    "price": float,
+    "price_desc": float,
+    "rating": float,
+    "relevance": float,
+    "newest": datetime,
+}
+
+def _valid_value(value: Any, expected: type) -> bool:
+    if isinstance(value, bool):
+        return False
+    if expected is float:
+        return isinstance(value, (int, float))
+    return isinstance(value, expected)
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[Any, int]:
+    """Decode a cursor into (sort value, last id); 400 when invalid or from another sort"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        value, last_id = data["v"], data["id"]
+        if isinstance(value, dict):
+            value = datetime.fromisoformat(value["dt"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if data.get("s") != sort:
+        raise HTTPException(status_code=400, detail="Cursor does not match the requested sort")
+    # A hand-made value of the wrong type would fail deep in the query (or silently match nothing)
+    if not _valid_value(last_id, int) or not _valid_value(value, _SORT_VALUE_TYPES.get(sort, float)):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value, last_id
@@ -0,0 +1,129 @@
+"""
+Password hashing service: the shared bcrypt context and a bounded worker pool.
+
+The work factor comes from settings.bcrypt_rounds (or the fast test profile);
+hashes made with a lower cost report needs_update and are rehashed on the
+next successful login. Stronger hashes are left alone, so the fast profile
+never downgrades real hashes in a shared or restored database.
+
+bcrypt takes hundreds of milliseconds per call; running it on the event loop
+stalls every other request. Work runs on a fixed number of threads (bcrypt
+releases the GIL) and callers beyond the queue limit get an immediate 503
+instead of piling up behind a login storm.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+from config import settings
+
+# Hashing profiles selected with settings.password_hash_profile
+# - secure: settings.bcrypt_rounds
+# - fast: bcrypt's minimum cost; insecure, for test suites and data seeding only
+PASSWORD_HASH_PROFILES = {
+    "secure": None,
+    "fast": 4,
+}
+
+def get_bcrypt_rounds(profile: str = None) -> int:
+    """bcrypt cost for a profile, defaulting to settings.password_hash_profile"""
+    profile = profile or settings.password_hash_profile
+    if profile not in PASSWORD_HASH_PROFILES:
+        raise ValueError(f"Unknown password hash profile '{profile}', expected one of {list(PASSWORD_HASH_PROFILES)}")
+    return PASSWORD_HASH_PROFILES[profile] or settings.bcrypt_rounds
+
+def create_password_context(rounds: int) -> CryptContext:
+    """bcrypt context that hashes with `rounds` and flags lower costs for rehashing"""
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+    )
+
+pwd_context = create_password_context(get_bcrypt_rounds())
+
+def hash_password(password: str) -> str:
+    """Hash a password with the configured work factor"""
+    return pwd_context.hash(password)
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against its hash"""
+    return pwd_context.verify(plain_password, hashed_password)
+
+def password_needs_update(hashed_password: str) -> bool:
+    """True when a hash was made with a lower work factor (or another scheme)"""
+    return pwd_context.needs_update(hashed_password)
+
+class PasswordWorkerPool:
+    """Size-limited thread pool with a queue-depth limit and metrics"""
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password")
+        self._lock = threading.Lock()
+        self.pending = 0  # Submitted and not finished (running + queued)
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.total_wait_time = 0.0  # seconds spent queued
+        self.total_run_time = 0.0  # seconds spent hashing
+
+    async def run(self, fn, *args):
+        """Run fn(*args) on the pool, or raise 503 when the queue is full"""
+        with self._lock:
+            if self.pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Authentication service is busy, please retry shortly",
+                    headers={"Retry-After": "1"},
+                )
+            self.pending += 1
+
+        submitted_at = time.perf_counter()
+        future = self._executor.submit(self._timed, fn, args, submitted_at)
+        future.add_done_callback(self._finished)
+        return await asyncio.wrap_future(future)
+
+    def _timed(self, fn, args, submitted_at: float):
+        started_at = time.perf_counter()
+        with self._lock:
+            self.running += 1
+            self.total_wait_time += started_at - submitted_at
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.total_run_time += time.perf_counter() - started_at
+
+    def _finished(self, future):
+        with self._lock:
+            self.pending -= 1
+            if future.cancelled() or future.exception() is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    def stats(self) -> dict:
+        """Pool size, queue depth and timing counters"""
+        with self._lock:
+            finished = self.completed + self.failed
+            return {
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": self.running,
+                "queued": self.pending - self.running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self.total_wait_time / finished * 1000, 2) if finished else 0.0,
+                "avg_run_ms": round(self.total_run_time / finished * 1000, 2) if finished else 0.0,
+            }
+
+password_pool = PasswordWorkerPool(settings.password_pool_workers, settings.password_pool_max_queue)
@@ -0,0 +1,244 @@
+"""
+Set-based implementations of the /products/batch endpoints.
+
+Rows are validated up front with one IN query (SKUs for creates, ids for
+updates and deletes), then written in chunks of settings.product_batch_chunk_size:
+one multi-row INSERT ... RETURNING or executemany UPDATE and one commit per
+chunk instead of a query and commit per product. A chunk that fails as a whole
+is retried row by row, so one bad row still only costs its own entry in the
+per-index error report. Deletes remove the child rows and products with one
+DELETE ... WHERE IN per table.
+"""
+from datetime import datetime
+from typing import Dict, List, Tuple
+from pydantic import ValidationError
+from sqlalchemy import delete, insert, inspect, select, update
+from sqlalchemy.exc import DBAPIError
+from models import (
+    Product, ProductTag, Order, OrderItem, CartItem, Review, WishlistItem, InventoryTransaction
+)
+from models.order import OrderStatus
+from schemas import ProductCreate, ProductUpdate
+from services.product_tags import normalize_tags
+from config import settings
+
+# Fields clients may set; ids, ratings, timestamps and the like are server-managed
+WRITABLE_FIELDS = frozenset(ProductCreate.model_fields) | frozenset(ProductUpdate.model_fields)
+# Settable on create although ProductCreate doesn't declare them (status flags)
+_CREATE_FLAGS = tuple(name for name in ProductUpdate.model_fields if name not in ProductCreate.model_fields)
+
+def _required_fields() -> List[str]:
+    """Columns a new product must provide (not nullable and without a default)"""
+    return [
+        column.key for column in inspect(Product).columns
+        if not column.nullable and column.default is None and column.server_default is None and not column.primary_key
+    ]
+
+def _validation_message(error: ValidationError) -> str:
+    """Short field-level description of a schema validation error"""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc']) or 'row'}: {detail['msg']}" for detail in error.errors()
+    )
+
+def _error_message(error: Exception) -> str:
+    """Database error without the statement and bound parameters SQLAlchemy appends"""
+    if isinstance(error, DBAPIError):
+        return str(error.orig).splitlines()[0]
+    return str(error)
+
+def _create_row(product_data: dict) -> dict:
+    """Validated INSERT row with every writable column set (model defaults where not given)"""
+    row = ProductCreate.model_validate(
+        {name: value for name, value in product_data.items() if name in ProductCreate.model_fields}
+    ).model_dump(mode="json")
+    flags = ProductUpdate.model_validate({name: product_data[name] for name in _CREATE_FLAGS if name in product_data})
+    for name in _CREATE_FLAGS:
+        value = getattr(flags, name)
+        row[name] = value if value is not None else inspect(Product).columns[name].default.arg
+    # The bulk INSERT bypasses Product.__init__, so apply what it sets
+    row["published_at"] = datetime.utcnow()
+    return row
+
+def _chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _insert_products(db, rows: List[dict]) -> List[int]:
+    """Insert products and their tag rows; returns the new ids in row order"""
+    # The ORM leaves None values out of the INSERT and runs one statement per run of
+    # rows with the same remaining columns, so send rows with the same set together
+    statement_order = sorted(rows, key=lambda row: sorted(name for name, value in row.items() if value is not None))
+    # RETURNING order isn't guaranteed for multi-row inserts (and requesting it costs one
+    # statement per row on SQLite); SKUs are unique, so match the ids up by SKU instead
+    ids_by_sku = {
+        sku: product_id
+        for product_id, sku in db.execute(insert(Product).returning(Product.id, Product.sku), statement_order)
+    }
+    product_ids = [ids_by_sku[row["sku"]] for row in rows]
+    links = [
+        {"product_id": product_id, "tag": tag}
+        for product_id, row in zip(product_ids, rows)
+        for tag in normalize_tags(row.get("tags"))
+    ]
+    if links:
+        db.execute(insert(ProductTag), links)
+    return product_ids
+
+def bulk_create_products(db, products_data: List[dict]) -> Tuple[List[int], List[dict]]:
+    """Create products in chunks; returns (created ids, [{"index", "error"}])"""
+    required = _required_fields()
+    errors = []
+    pending: List[Tuple[int, dict]] = []
+    seen_skus: Dict[str, int] = {}
+    for index, product_data in enumerate(products_data):
+        unknown = sorted(set(product_data) - WRITABLE_FIELDS)
+        if unknown:
+            errors.append({"index": index, "error": f"Unknown fields {unknown}"})
+            continue
+        missing = [name for name in required if product_data.get(name) is None]
+        if missing:
+            errors.append({"index": index, "error": f"Missing required fields {missing}"})
+            continue
+        try:
+            row = _create_row(product_data)
+        except ValidationError as e:
+            errors.append({"index": index, "error": _validation_message(e)})
+            continue
+        sku = row["sku"]
+        if sku in seen_skus:
+            errors.append({"index": index, "error": f"SKU {sku} duplicates index {seen_skus[sku]}"})
+            continue
+        seen_skus[sku] = index
+        pending.append((index, row))
+
+    existing = set(db.scalars(select(Product.sku).where(Product.sku.in_(list(seen_skus))))) if seen_skus else set()
+    if existing:
+        errors.extend({"index": index, "error": f"SKU {row['sku']} already exists"} for index, row in pending if row["sku"] in existing)
+        pending = [(index, row) for index, row in pending if row["sku"] not in existing]
+
+    created = []
+    for chunk in _chunks(pending, settings.product_batch_chunk_size):
+        try:
+            created.extend(_insert_products(db, [row for _, row in chunk]))
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Find the offending rows; the others still go in
+            for index, row in chunk:
+                try:
+                    created.extend(_insert_products(db, [row]))
+                    db.commit()
+                except Exception as e:
+                    errors.append({"index": index, "error": _error_message(e)})
+                    db.rollback()
+
+    errors.sort(key=lambda error: error["index"])
+    return created, errors
+
+def _update_products(db, rows: List[dict]):
+    """executemany UPDATE of rows sharing one key set, replacing tag rows when tags change"""
+    if len(rows[0]) == 1:
+        return  # Only the id: nothing to change
+    db.execute(update(Product), rows)
+    if "tags" in rows[0]:
+        db.execute(delete(ProductTag).where(ProductTag.product_id.in_([row["id"] for row in rows])))
+        links = [{"product_id": row["id"], "tag": tag} for row in rows for tag in normalize_tags(row["tags"])]
+        if links:
+            db.execute(insert(ProductTag), links)
+
+def bulk_update_products(db, updates_data: List[dict]) -> Tuple[List[int], List[dict]]:
+    """Update products by id in chunks; returns (updated ids per input row, [{"index", "error"}])"""
+    errors = []
+    requested: List[Tuple[int, int]] = []
+    for index, update_data in enumerate(updates_data):
+        if not update_data.get("id"):
+            errors.append({"index": index, "error": "Product ID required"})
+            continue
+        requested.append((index, update_data["id"]))
+
+    ids = list(dict.fromkeys(product_id for _, product_id in requested))
+    found = set()
+    for chunk in _chunks(ids, settings.product_batch_chunk_size):
+        found.update(db.scalars(select(Product.id).where(Product.id.in_(chunk))))
+
+    # Later rows for the same product win, as if applied one after another
+    changes: Dict[int, dict] = {}
+    indexes: Dict[int, List[int]] = {}
+    for index, product_id in requested:
+        if product_id not in found:
+            errors.append({"index": index, "error": f"Product {product_id} not found"})
+            continue
+        fields = {field: value for field, value in updates_data[index].items() if field in WRITABLE_FIELDS}
+        try:
+            fields = ProductUpdate.model_validate(fields).model_dump(mode="json", exclude_unset=True)
+        except ValidationError as e:
+            errors.append({"index": index, "error": _validation_message(e)})
+            continue
+        changes.setdefault(product_id, {"id": product_id}).update(fields)
+        indexes.setdefault(product_id, []).append(index)
+
+    # executemany needs the same columns in every row, so group rows by key set
+    groups: Dict[frozenset, List[dict]] = {}
+    for product_id, fields in changes.items():
+        groups.setdefault(frozenset(fields), []).append(fields)
+
+    updated = set()
+    for rows in groups.values():
+        for chunk in _chunks(rows, settings.product_batch_chunk_size):
+            try:
+                _update_products(db, chunk)
+                db.commit()
+                updated.update(row["id"] for row in chunk)
+            except Exception:
+                db.rollback()
+                for row in chunk:
+                    try:
+                        _update_products(db, [row])
+                        db.commit()
+                        updated.add(row["id"])
+                    except Exception as e:
+                        db.rollback()
+                        errors.extend({"index": index, "error": _error_message(e)} for index in indexes[row["id"]])
+
+    errors.sort(key=lambda error: error["index"])
+    updated_ids = [product_id for index, product_id in requested if product_id in updated]
+    return updated_ids, errors
+
+# Rows referencing products, deleted with them (the ORM cascades of Product)
+_PRODUCT_CHILD_TABLES = (OrderItem, CartItem, Review, WishlistItem, InventoryTransaction, ProductTag)
+_ACTIVE_ORDER_STATUSES = (OrderStatus.PENDING, OrderStatus.CONFIRMED, OrderStatus.PROCESSING)
+
+def bulk_delete_products(db, product_ids: List[int]) -> Tuple[List[int], List[dict]]:
+    """Delete products without active orders in one transaction; returns (deleted ids, [{"product_id", "error"}])"""
+    ids = list(dict.fromkeys(product_ids))
+    found = set()
+    blocked = set()
+    for chunk in _chunks(ids, settings.product_batch_chunk_size):
+        found.update(db.scalars(select(Product.id).where(Product.id.in_(chunk))))
+        blocked.update(db.scalars(
+            select(OrderItem.product_id).join(Order)
+            .where(OrderItem.product_id.in_(chunk), Order.status.in_(_ACTIVE_ORDER_STATUSES))
+            .group_by(OrderItem.product_id)
+        ))
+
+    errors = []
+    deletable = []
+    for product_id in ids:
+        if product_id not in found:
+            errors.append({"product_id": product_id, "error": "Product not found"})
+        elif product_id in blocked:
+            errors.append({"product_id": product_id, "error": "Product has active orders"})
+        else:
+            deletable.append(product_id)
+
+    try:
+        for chunk in _chunks(deletable, settings.product_batch_chunk_size):
+            for child in _PRODUCT_CHILD_TABLES:
+                db.execute(delete(child).where(child.product_id.in_(chunk)))
+            db.execute(delete(Product).where(Product.id.in_(chunk)))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        errors.extend({"product_id": product_id, "error": _error_message(e)} for product_id in deletable)
+        return [], errors
+    return deletable, errors
@@ -0,0 +1,53 @@
+"""
+In-process cache of product detail responses (GET /products/{id}).
+
+Values are the serialized ProductResponse JSON and its ETag, so a hit skips
+both the query and response validation. Every code path that changes a product invalidates
+its entry after committing. A generation counter stops a read that started
+before an invalidation from caching the old row. Entries also expire after
+settings.product_cache_ttl_seconds, bounding staleness after writes made
+outside the API (scripts, other workers).
+"""
+import threading
+from typing import Optional, Tuple
+from services.cache import LRUCache
+from config import settings
+
+class ProductCache:
+    """Serialized ProductResponse and ETag by product id, with LRU eviction"""
+
+    def __init__(self, max_size: int, ttl: Optional[float] = None):
+        self._cache = LRUCache(max_size, ttl)
+        self._lock = threading.Lock()
+        self.generation = 0  # Bumped on every invalidation
+        self.invalidations = 0
+
+    def get(self, product_id: int) -> Optional[Tuple[bytes, str]]:
+        """Cached (response body, ETag), or None"""
+        return self._cache.get(product_id)
+
+    def set(self, product_id: int, body: bytes, etag: str, generation: int):
+        """Cache a response body read while `generation` was current"""
+        with self._lock:
+            if generation == self.generation:
+                self._cache.set(product_id, (body, etag))
+
+    def invalidate(self, *product_ids: int):
+        """Drop entries for changed (or deleted) products"""
+        with self._lock:
+            self.generation += 1
+            for product_id in product_ids:
+                self._cache.delete(product_id)
+                self.invalidations += 1
+
+    def clear(self):
+        """Drop all entries"""
+        with self._lock:
+            self.generation += 1
+            self._cache.clear()
+
+    def stats(self) -> dict:
+        """Cache counters plus invalidation count"""
+        return {**self._cache.stats(), "invalidations": self.invalidations}
+
+product_cache = ProductCache(settings.product_cache_size, settings.product_cache_ttl_seconds or None)
@@ -0,0 +1,122 @@
+"""
+Full-text product search backed by an SQLite FTS5 index.
+
+products_fts is an external-content FTS5 table over products (name,
+description, brand, sku, tags) kept in sync by triggers, so every write path,
+including bulk Core inserts and populate_mock_data.py, is indexed without
+application code. Matches are ranked with BM25. On other databases, or SQLite
+builds without FTS5, callers fall back to LIKE filters.
+"""
+import re
+from typing import Optional
+from sqlalchemy import column, func, literal_column, select, table, text
+from sqlalchemy.exc import OperationalError
+
+FTS_TABLE = "products_fts"
+FTS_COLUMNS = ("name", "description", "brand", "sku", "tags")
+
+# BM25 column weights, in FTS_COLUMNS order: a hit in the name or SKU counts
+# far more than one buried in the description
+BM25_WEIGHTS = (10.0, 1.0, 5.0, 8.0, 3.0)
+
+# Longest queries are cut to this many terms
+MAX_QUERY_TERMS = 10
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+_FTS_SCHEMA = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        {", ".join(FTS_COLUMNS)},
+        content='products', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {", ".join(FTS_COLUMNS)})
+        VALUES (new.id, {", ".join("new." + name for name in FTS_COLUMNS)});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {", ".join(FTS_COLUMNS)})
+        VALUES ('delete', old.id, {", ".join("old." + name for name in FTS_COLUMNS)});
+    END
+    """,
+    # Only searchable columns fire the trigger; stock and price updates don't touch the index
+    f"""
+    CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF {", ".join(FTS_COLUMNS)} ON products BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {", ".join(FTS_COLUMNS)})
+        VALUES ('delete', old.id, {", ".join("old." + name for name in FTS_COLUMNS)});
+        INSERT INTO {FTS_TABLE}(rowid, {", ".join(FTS_COLUMNS)})
+        VALUES (new.id, {", ".join("new." + name for name in FTS_COLUMNS)});
+    END
+    """,
+]
+
+_fts = table(FTS_TABLE, column("rowid"), column(FTS_TABLE))
+
+def build_match_query(search_text: str, columns: tuple = None) -> Optional[str]:
+    """
+    Turn free text into an FTS5 query: every term must match as a prefix.
+    Terms are quoted so user input can't inject FTS operators. Returns None
+    when the text has no searchable terms.
+    """
+    terms = _TERM.findall(search_text)[:MAX_QUERY_TERMS]
+    if not terms:
+        return None
+    query = " ".join(f'"{term}"*' for term in terms)
+    if columns:
+        query = f"{{{' '.join(columns)}}} : ({query})"
+    return query
+
+class ProductSearchIndex:
+    """Creates, rebuilds and queries the products_fts index"""
+
+    def __init__(self):
+        self.enabled = False
+
+    def install(self, db_engine) -> bool:
+        """Create the FTS table and triggers if missing; backfill a new index"""
+        if db_engine.dialect.name != "sqlite":
+            self.enabled = False
+            return False
+        try:
+            with db_engine.begin() as conn:
+                exists = conn.exec_driver_sql(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+                ).first() is not None
+                for statement in _FTS_SCHEMA:
+                    conn.exec_driver_sql(statement)
+                if not exists:
+                    conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        except OperationalError as e:
+            print(f"Warning: full-text search disabled, FTS5 unavailable: {e}")
+            self.enabled = False
+            return False
+        self.enabled = True
+        return True
+
+    def rebuild(self, db_engine):
+        """Re-index every product from the products table and merge index segments"""
+        with db_engine.begin() as conn:
+            conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+            conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+
+    def match_subquery(self, search_text: str, columns: tuple = None):
+        """
+        Subquery of (product_id, rank) for products matching the text, or None
+        when it has no searchable terms. Lower rank is a better match.
+        """
+        match = build_match_query(search_text, columns)
+        if match is None:
+            return None
+        rank = func.bm25(literal_column(FTS_TABLE), *(literal_column(str(w)) for w in BM25_WEIGHTS))
+        return (
+            select(_fts.c.rowid.label("product_id"), rank.label("rank"))
+            .where(text(f"{FTS_TABLE} MATCH :fts_query").bindparams(fts_query=match))
+            .subquery("product_matches")
+        )
+
+product_search = ProductSearchIndex()
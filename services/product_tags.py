@@ -0,0 +1,65 @@
+"""
+Normalized product tags.
+
+Product.tags stays the JSON list returned by the API; product_tags holds one
+row per (product, tag) so tag filters are index lookups on (tag, product_id)
+instead of scans of the serialized JSON. Write paths call sync_product_tags
+in the same transaction as the product change.
+"""
+from typing import Iterable, List, Optional
+from sqlalchemy import delete, false, insert, intersect, select, union
+from models import Product, ProductTag
+
+def normalize_tags(tags: Optional[Iterable]) -> List[str]:
+    """Distinct non-empty tags, whitespace-trimmed, in their original order"""
+    if not tags:
+        return []
+    return list(dict.fromkeys(tag.strip() for tag in tags if isinstance(tag, str) and tag.strip()))
+
+def sync_product_tags(product: Product):
+    """Make product.tag_links match product.tags (flushed with the product)"""
+    wanted = normalize_tags(product.tags)
+    current = {link.tag: link for link in product.tag_links}
+    for tag, link in current.items():
+        if tag not in wanted:
+            product.tag_links.remove(link)
+    for tag in wanted:
+        if tag not in current:
+            product.tag_links.append(ProductTag(tag))
+
+def tag_filter(tags: Iterable[str], match: str = "all"):
+    """
+    WHERE clause for products carrying all (or any) of the tags. Each tag is an
+    index range scan; "all" intersects them and "any" unions them.
+    """
+    tags = normalize_tags(tags)
+    if not tags:
+        return false()
+    selects = [select(ProductTag.product_id).where(ProductTag.tag == tag) for tag in tags]
+    if len(selects) == 1:
+        return Product.id.in_(selects[0])
+    combine = intersect if match == "all" else union
+    return Product.id.in_(combine(*selects))
+
+def backfill_product_tags(db, batch_size: int = 1000) -> int:
+    """Rebuild product_tags from Product.tags for every product; returns rows written"""
+    db.execute(delete(ProductTag))
+    written = 0
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(Product.id, Product.tags).where(Product.id > last_id).order_by(Product.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        links = [
+            {"product_id": product_id, "tag": tag}
+            for product_id, tags in rows
+            for tag in normalize_tags(tags)
+        ]
+        if links:
+            db.execute(insert(ProductTag), links)
+            written += len(links)
+        last_id = rows[-1].id
+    db.commit()
+    return written
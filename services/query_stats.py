@@ -0,0 +1,103 @@
+"""
+Per-request SQL statistics: statement count, total DB time and N+1 detection.
+
+SQLAlchemy cursor events record every statement into the stats object of the
+request being served (tracked with a ContextVar), so sync and async sessions
+opened anywhere during the request are counted.
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Literals and bind placeholders collapse to "?" so that statements differing
+# only by parameters share one shape
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_BIND_PARAMETER = re.compile(r"%\(\w+\)s|:\w+|\$\d+|\?")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_statement(statement: str) -> str:
+    """Reduce a SQL statement to its shape (no literals, single-line, IN lists collapsed)"""
+    shape = _STRING_LITERAL.sub("?", statement)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _BIND_PARAMETER.sub("?", shape)
+    shape = _VALUE_LIST.sub("(?)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+class RequestQueryStats:
+    """SQL statements issued while serving one request"""
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.method = scope.get("method")
+        self.path = scope.get("path")
+        self.query_count = 0
+        self.total_time = 0.0  # seconds
+        self.statement_counts = Counter()
+
+    @property
+    def endpoint(self) -> Optional[str]:
+        """Name of the route function, available once the router has matched the request"""
+        return getattr(self.scope.get("endpoint"), "__name__", None)
+
+    def record(self, statement: str, elapsed: float):
+        """Record one executed statement"""
+        self.query_count += 1
+        self.total_time += elapsed
+        self.statement_counts[normalize_statement(statement)] += 1
+
+    def repeated_statements(self, threshold: int) -> list:
+        """Statement shapes executed more than `threshold` times, most repeated first"""
+        return [
+            (statement, count)
+            for statement, count in self.statement_counts.most_common()
+            if count > threshold
+        ]
+
+    def warn_repeated_statements(self, threshold: int):
+        """Log likely N+1 query patterns for this request"""
+        for statement, count in self.repeated_statements(threshold):
+            logger.warning(
+                "Possible N+1 query: endpoint=%s request=\"%s %s\" repeats=%d queries=%d db_time_ms=%.2f statement=%s",
+                self.endpoint or "-", self.method, self.path, count,
+                self.query_count, self.total_time * 1000, statement
+            )
+
+_current_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("request_query_stats", default=None)
+
+def start_request_stats(scope: dict):
+    """Begin collecting statistics for the current request; returns (stats, reset token)"""
+    stats = RequestQueryStats(scope)
+    return stats, _current_stats.set(stats)
+
+def finish_request_stats(token):
+    """Stop collecting statistics for the current request"""
+    _current_stats.reset(token)
+
+def get_request_stats() -> Optional[RequestQueryStats]:
+    """Statistics of the request being served, if any"""
+    return _current_stats.get()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_stats_started_at = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started_at = getattr(context, "_query_stats_started_at", None)
+    stats = _current_stats.get()
+    if started_at is None or stats is None:
+        return
+    stats.record(statement, time.perf_counter() - started_at)
+
+def install_query_stats(*engines):
+    """Attach the statement counters to sync engines (use AsyncEngine.sync_engine for async ones)"""
+    for db_engine in engines:
+        if not event.contains(db_engine, "before_cursor_execute", _before_cursor_execute):
+            event.listen(db_engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(db_engine, "after_cursor_execute", _after_cursor_execute)
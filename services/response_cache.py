@@ -0,0 +1,286 @@
+"""
+In-process cache of public GET responses.
+
+ResponseCacheMiddleware is a pure ASGI middleware that stores complete 200
+responses of unauthenticated GETs to the routes in CACHE_RULES, keyed by path
+and normalized query string. Every entry carries surrogate tags (e.g.
+"catalog", "product:42") so write paths purge exactly what they changed.
+
+Entries are fresh for the TTL; afterwards, for the stale window, the stale
+body is still served while a single background request refreshes it, so a
+burst of traffic on an expired page costs one backend request.
+"""
+import asyncio
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+from starlette.datastructures import Headers
+from services.http_cache import if_none_match
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Cacheable paths and the tags of their responses; {id} is the matched path id
+CACHE_RULES = [
+    (re.compile(r"^/products$"), ("catalog",)),
+    (re.compile(r"^/products/(?P<id>\d+)$"), ("product:{id}",)),
+    (re.compile(r"^/reviews/(?P<id>\d+)$"), ("reviews:{id}",)),
+    (re.compile(r"^/search/suggestions$"), ("catalog",)),
+]
+
+# Per-request headers that must not be replayed from the cache
+_UNCACHED_HEADERS = {b"x-db-queries", b"x-db-time", b"set-cookie", b"date"}
+
+def tags_for_path(path: str) -> Optional[Tuple[str, ...]]:
+    """Surrogate tags for a cacheable path, or None when the path isn't cached"""
+    for pattern, tags in CACHE_RULES:
+        match = pattern.match(path)
+        if match:
+            return tuple(tag.format(**match.groupdict()) for tag in tags)
+    return None
+
+def cache_key(path: str, query_string: bytes) -> str:
+    """Path plus query parameters in sorted order, so ?a=1&b=2 and ?b=2&a=1 share an entry"""
+    params = sorted(parse_qsl(query_string.decode("latin-1"), keep_blank_values=True))
+    return f"{path}?{urlencode(params)}" if params else path
+
+class _Entry:
+    __slots__ = ("status", "headers", "body", "tags", "etag", "stored_at", "fresh_until", "stale_until")
+
+    def __init__(self, status, headers, body, tags, etag, ttl, stale):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.tags = tags
+        self.etag = etag
+        self.stored_at = time.monotonic()
+        self.fresh_until = self.stored_at + ttl
+        self.stale_until = self.fresh_until + stale
+
+class ResponseCache:
+    """Size-bounded LRU of responses with TTL, stale window and tag purges"""
+
+    def __init__(self, max_size: int, ttl: float, stale: float, max_body_bytes: int):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stale = stale
+        self.max_body_bytes = max_body_bytes
+        self._entries = OrderedDict()  # key -> _Entry
+        self._keys_by_tag = {}  # tag -> set of keys
+        self._tag_generations = {}  # tag -> purge count, to drop responses computed before a purge
+        self._epoch = 0  # Bumped by clear()
+        self._revalidating = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.purged = 0
+        self.evictions = 0
+        self.revalidations = 0
+
+    def lookup(self, key: str) -> Tuple[Optional[_Entry], bool]:
+        """(entry, is_fresh); entry is None on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.stale_until <= now:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None, False
+            self._entries.move_to_end(key)
+            if entry.fresh_until > now:
+                self.hits += 1
+                return entry, True
+            self.stale_hits += 1
+            return entry, False
+
+    def snapshot(self, tags: Iterable[str]) -> tuple:
+        """Purge state of the tags, taken before computing a response"""
+        with self._lock:
+            return self._epoch, tuple(self._tag_generations.get(tag, 0) for tag in tags)
+
+    def store(self, key: str, tags: Tuple[str, ...], status: int, headers: list, body: bytes, snapshot: tuple):
+        """Cache a response unless one of its tags was purged while it was computed"""
+        if self.max_size <= 0 or len(body) > self.max_body_bytes:
+            return
+        etag = next((value.decode("latin-1") for name, value in headers if name == b"etag"), None)
+        with self._lock:
+            if snapshot != (self._epoch, tuple(self._tag_generations.get(tag, 0) for tag in tags)):
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(status, headers, body, tags, etag, self.ttl, self.stale)
+            for tag in tags:
+                self._keys_by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        for tag in entry.tags:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+    def purge(self, *tags: str) -> int:
+        """Drop every entry carrying any of the tags; returns entries removed"""
+        removed = 0
+        with self._lock:
+            for tag in tags:
+                self._tag_generations[tag] = self._tag_generations.get(tag, 0) + 1
+                for key in list(self._keys_by_tag.get(tag, ())):
+                    self._remove(key)
+                    removed += 1
+            self.purged += removed
+        return removed
+
+    def clear(self):
+        """Drop all entries"""
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._keys_by_tag.clear()
+
+    def begin_revalidation(self, key: str) -> bool:
+        """Claim the background refresh of a stale key (False if one is running)"""
+        with self._lock:
+            if key in self._revalidating:
+                return False
+            self._revalidating.add(key)
+            self.revalidations += 1
+            return True
+
+    def end_revalidation(self, key: str):
+        with self._lock:
+            self._revalidating.discard(key)
+
+    def stats(self) -> dict:
+        """Size and hit/miss counters"""
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "stale_seconds": self.stale,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            "purged": self.purged,
+            "evictions": self.evictions,
+            "revalidations": self.revalidations,
+        }
+
+class ResponseCacheMiddleware:
+    """Serve cacheable public GETs from a ResponseCache"""
+
+    def __init__(self, app, cache: ResponseCache):
+        self.app = app
+        self.cache = cache
+        self._tasks = set()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or not settings.response_cache_enabled:
+            await self.app(scope, receive, send)
+            return
+        tags = tags_for_path(scope["path"])
+        request_headers = Headers(scope=scope)
+        if tags is None or "authorization" in request_headers:
+            await self.app(scope, receive, send)
+            return
+
+        key = cache_key(scope["path"], scope["query_string"])
+        entry, fresh = self.cache.lookup(key)
+        if entry is None:
+            await self._fetch(scope, receive, send, key, tags)
+            return
+        if not fresh and self.cache.begin_revalidation(key):
+            task = asyncio.create_task(self._revalidate(scope, key, tags))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        await self._send_entry(entry, request_headers, send, "HIT" if fresh else "STALE")
+
+    async def _send_entry(self, entry: _Entry, request_headers: Headers, send, cache_status: str):
+        age = str(int(time.monotonic() - entry.stored_at)).encode()
+        extra = [(b"x-cache", cache_status.encode()), (b"age", age)]
+        if entry.etag and if_none_match(request_headers.get("if-none-match"), entry.etag):
+            headers = [(name, value) for name, value in entry.headers if name in (b"etag", b"cache-control")]
+            await send({"type": "http.response.start", "status": 304, "headers": headers + extra})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await send({"type": "http.response.start", "status": entry.status, "headers": entry.headers + extra})
+        await send({"type": "http.response.body", "body": entry.body})
+
+    async def _fetch(self, scope, receive, send, key: str, tags: tuple):
+        """Run the request, streaming the response through while keeping a copy"""
+        snapshot = self.cache.snapshot(tags)
+        start = None
+        chunks = []
+
+        async def capture(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                message = {**message, "headers": list(message.get("headers", [])) + [(b"x-cache", b"MISS")]}
+            elif message["type"] == "http.response.body" and start is not None:
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    self._store(key, tags, start, b"".join(chunks), snapshot)
+            await send(message)
+
+        await self.app(scope, receive, capture)
+
+    async def _revalidate(self, scope, key: str, tags: tuple):
+        """Re-run a request in the background and replace the stale entry"""
+        snapshot = self.cache.snapshot(tags)
+        # Unconditional request, so the refresh yields a full body
+        headers = [(name, value) for name, value in scope["headers"] if name not in (b"if-none-match", b"if-modified-since")]
+        background_scope = {**scope, "headers": headers}
+        start = None
+        chunks = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def capture(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        try:
+            await self.app(background_scope, receive, capture)
+            if start is not None:
+                self._store(key, tags, start, b"".join(chunks), snapshot)
+        except Exception as e:
+            logger.error("Background refresh of %s failed: %s", key, e)
+        finally:
+            self.cache.end_revalidation(key)
+
+    def _store(self, key: str, tags: tuple, start: dict, body: bytes, snapshot: tuple):
+        if start["status"] != 200:
+            return
+        headers = [(name.lower(), value) for name, value in start.get("headers", [])]
+        for name, value in headers:
+            if name == b"cache-control" and (b"private" in value or b"no-store" in value):
+                return
+            if name == b"set-cookie":
+                return
+        headers = [(name, value) for name, value in headers if name not in _UNCACHED_HEADERS]
+        self.cache.store(key, tags, start["status"], headers, body, snapshot)
+
+response_cache = ResponseCache(
+    settings.response_cache_size,
+    settings.response_cache_ttl_seconds,
+    settings.response_cache_stale_seconds,
+    settings.response_cache_max_body_bytes,
+)
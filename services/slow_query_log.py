@@ -0,0 +1,178 @@
+"""
+Slow query log with EXPLAIN QUERY PLAN capture.
+
+Statements slower than settings.slow_query_threshold_ms are queued from the
+cursor event and processed by a background thread, which runs the query plan
+on the read engine, logs the statement and aggregates it by normalized SQL.
+The request that issued the statement only pays for a queue put.
+"""
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from sqlalchemy import event
+from services.query_stats import normalize_statement, get_request_stats
+
+logger = logging.getLogger(__name__)
+
+# Statements worth explaining; transaction control, PRAGMA etc. are skipped
+EXPLAINABLE_PREFIXES = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+# Keep parameter values readable in logs (JSON columns, long descriptions)
+MAX_PARAMETER_LENGTH = 200
+
+def _format_parameters(parameters, executemany: bool):
+    """Bound parameters as a log-friendly structure (first row for executemany)"""
+    if executemany and parameters:
+        parameters = parameters[0]
+    if isinstance(parameters, dict):
+        return {key: _format_value(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_format_value(value) for value in parameters]
+    return parameters
+
+def _format_value(value):
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    text = str(value)
+    if len(text) > MAX_PARAMETER_LENGTH:
+        text = text[:MAX_PARAMETER_LENGTH] + "..."
+    return text
+
+class SlowQueryLog:
+    """Background capture and aggregation of slow statements"""
+
+    def __init__(self, threshold_ms: float, max_statements: int = 100, queue_size: int = 1000, samples_per_statement: int = 5):
+        self.threshold = threshold_ms / 1000
+        self.max_statements = max_statements
+        self.samples_per_statement = samples_per_statement
+        self.explain_engine = None
+        self.dropped = 0  # Slow statements not captured because the queue was full
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._entries = OrderedDict()  # normalized SQL -> aggregate, least recently seen first
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def install(self, *engines, explain_engine=None):
+        """Time statements on the given sync engines; plans are taken on explain_engine"""
+        self.explain_engine = explain_engine or engines[0]
+        for db_engine in engines:
+            # Engines may be shared (read engine falling back to the write engine)
+            if not event.contains(db_engine, "before_cursor_execute", self._before_cursor_execute):
+                event.listen(db_engine, "before_cursor_execute", self._before_cursor_execute)
+                event.listen(db_engine, "after_cursor_execute", self._after_cursor_execute)
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name="slow-query-log", daemon=True)
+            self._worker.start()
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        context._slow_query_started_at = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started_at = getattr(context, "_slow_query_started_at", None)
+        if started_at is None:
+            return
+        elapsed = time.perf_counter() - started_at
+        if elapsed < self.threshold or statement.lstrip().upper().startswith("EXPLAIN"):
+            return
+
+        stats = get_request_stats()
+        endpoint = stats.endpoint if stats else None
+        request = f"{stats.method} {stats.path}" if stats else None
+        try:
+            self._queue.put_nowait((statement, parameters, executemany, elapsed, endpoint, request, datetime.utcnow()))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                self._process(*item)
+            except Exception as e:
+                logger.error("Slow query log failed to process a statement: %s", e)
+
+    def explain(self, statement: str, parameters, executemany: bool) -> list:
+        """Query plan rows for a statement, run on the explain engine"""
+        if not statement.lstrip().upper().startswith(EXPLAINABLE_PREFIXES):
+            return []
+        if executemany and parameters:
+            parameters = parameters[0]
+        prefix = "EXPLAIN QUERY PLAN " if self.explain_engine.dialect.name == "sqlite" else "EXPLAIN "
+        try:
+            with self.explain_engine.connect() as conn:
+                rows = conn.exec_driver_sql(prefix + statement, parameters or ()).fetchall()
+        except Exception as e:
+            # e.g. asyncpg-style placeholders explained through the psycopg2 engine
+            return [f"plan unavailable: {e.__class__.__name__}: {e}"]
+        # SQLite: (id, parent, notused, detail); PostgreSQL: one text column per line
+        return [str(row[-1]) for row in rows]
+
+    def _process(self, statement, parameters, executemany, elapsed, endpoint, request, seen_at):
+        plan = self.explain(statement, parameters, executemany)
+        formatted_parameters = _format_parameters(parameters, executemany)
+        duration_ms = round(elapsed * 1000, 2)
+
+        logger.warning(
+            "Slow query: %.2fms endpoint=%s request=\"%s\" parameters=%s statement=%s plan=%s",
+            duration_ms, endpoint or "-", request or "-", formatted_parameters,
+            " ".join(statement.split()), " | ".join(plan)
+        )
+
+        normalized = normalize_statement(statement)
+        with self._lock:
+            entry = self._entries.pop(normalized, None)
+            if entry is None:
+                entry = {
+                    "statement": normalized,
+                    "count": 0,
+                    "total_time_ms": 0.0,
+                    "max_time_ms": 0.0,
+                    "endpoints": {},
+                    "samples": deque(maxlen=self.samples_per_statement),
+                }
+            entry["count"] += 1
+            entry["total_time_ms"] += duration_ms
+            entry["max_time_ms"] = max(entry["max_time_ms"], duration_ms)
+            entry["last_seen"] = seen_at
+            entry["plan"] = plan
+            endpoint_key = endpoint or "-"
+            entry["endpoints"][endpoint_key] = entry["endpoints"].get(endpoint_key, 0) + 1
+            entry["samples"].append({
+                "duration_ms": duration_ms,
+                "endpoint": endpoint,
+                "request": request,
+                "parameters": formatted_parameters,
+                "seen_at": seen_at,
+            })
+            self._entries[normalized] = entry
+            while len(self._entries) > self.max_statements:
+                self._entries.popitem(last=False)
+
+    def top_statements(self, limit: int = 20, sort_by: str = "total_time_ms") -> list:
+        """Aggregated slow statements, worst first"""
+        with self._lock:
+            entries = [
+                {
+                    "statement": entry["statement"],
+                    "count": entry["count"],
+                    "total_time_ms": round(entry["total_time_ms"], 2),
+                    "avg_time_ms": round(entry["total_time_ms"] / entry["count"], 2),
+                    "max_time_ms": entry["max_time_ms"],
+                    "last_seen": entry["last_seen"],
+                    "endpoints": dict(entry["endpoints"]),
+                    "plan": entry["plan"],
+                    "samples": list(entry["samples"]),
+                }
+                for entry in self._entries.values()
+            ]
+        entries.sort(key=lambda entry: entry[sort_by], reverse=True)
+        return entries[:limit]
+
+    def clear(self):
+        """Forget all captured statements"""
+        with self._lock:
+            self._entries.clear()
+        self.dropped = 0
@@ -0,0 +1,83 @@
+"""
+In-memory table of per-user token versions.
+
+Tokens carry the user's version in the "ver" claim; a token whose version is
+older than the table's is revoked. Bumps update this process immediately and
+the table is reloaded every settings.token_version_refresh_seconds so bumps
+made by other workers are picked up too.
+"""
+import logging
+import threading
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import UserTokenVersion
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+class TokenVersionTable:
+    """user_id -> token version, loaded from user_token_versions"""
+
+    def __init__(self, session_factory, refresh_seconds: int):
+        self.session_factory = session_factory
+        self.refresh_seconds = refresh_seconds
+        self._versions = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._worker = None
+
+    def get(self, user_id: int) -> int:
+        """Current token version of a user (0 if never bumped)"""
+        return self._versions.get(user_id, 0)
+
+    def load(self):
+        """Reload all versions from the database"""
+        db = self.session_factory()
+        try:
+            rows = db.execute(select(UserTokenVersion.user_id, UserTokenVersion.version)).all()
+        finally:
+            db.close()
+        versions = {row.user_id: row.version for row in rows}
+        with self._lock:
+            # Keep local bumps whose transaction another worker hasn't seen yet
+            for user_id, version in self._versions.items():
+                if version > versions.get(user_id, 0):
+                    versions[user_id] = version
+            self._versions = versions
+
+    def bump(self, db: Session, user_id: int) -> int:
+        """
+        Increment a user's token version in the caller's session (committed
+        with the caller's change) and in memory, revoking existing tokens.
+        """
+        row = db.get(UserTokenVersion, user_id)
+        if row is None:
+            row = UserTokenVersion(user_id=user_id, version=self.get(user_id))
+            db.add(row)
+        row.version = max(row.version or 0, self.get(user_id)) + 1
+        with self._lock:
+            self._versions[user_id] = row.version
+        return row.version
+
+    def start(self):
+        """Load the table and keep refreshing it in a background thread"""
+        self.load()
+        if self._worker is None:
+            self._stop.clear()
+            self._worker = threading.Thread(target=self._run, name="token-version-refresh", daemon=True)
+            self._worker.start()
+
+    def stop(self):
+        """Stop the background refresh"""
+        self._stop.set()
+        self._worker = None
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_seconds):
+            try:
+                self.load()
+            except Exception as e:
+                logger.error("Failed to refresh token versions: %s", e)
+
+token_versions = TokenVersionTable(SessionLocal, settings.token_version_refresh_seconds)